@@ -2,12 +2,23 @@
 # Mason Hunerkoch
 # Description: Provided data structures necessary to complete the hash map.
 
+import os
+import pickle
+import struct
+import zlib
+from array import array
+
 # -------------- Used by both HashMaps (SC & OA)  -------------- #
 
 class DynamicArrayException(Exception):
     pass
 
 
+class HashMapModifiedException(RuntimeError):
+    """Raised by a hash map iterator when the map was changed after the iterator was created."""
+    pass
+
+
 class DynamicArray:
     """
     Class implementing a Dynamic Array
@@ -74,6 +85,76 @@ class DynamicArray:
         return len(self._data)
 
 
+# What a hash map iterator yields.
+ITER_KEYS = 0
+ITER_VALUES = 1
+ITER_ITEMS = 2
+
+
+class HashMapView:
+    """
+    Live view of the contents of a hash map. Nothing is copied: len() asks the map for its size and each
+    iteration starts a fresh iterator over the map's storage, so the view always shows the current contents.
+    The map must provide get_size, contains_key, get and _iterator(kind).
+    """
+
+    __slots__ = ('_map',)
+    _kind = ITER_KEYS
+
+    def __init__(self, hash_map) -> None:
+        """Initialize a view of hash_map."""
+        self._map = hash_map
+
+    def __len__(self) -> int:
+        """Return the number of keys in the map."""
+        return self._map.get_size()
+
+    def __iter__(self):
+        """Return a new iterator over the map."""
+        return self._map._iterator(self._kind)
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return type(self).__name__ + '(' + str(list(self)) + ')'
+
+
+class KeysView(HashMapView):
+    """Live view of the keys of a hash map."""
+
+    __slots__ = ()
+    _kind = ITER_KEYS
+
+    def __contains__(self, key: str) -> bool:
+        """Return True if key is in the map."""
+        return self._map.contains_key(key)
+
+
+class ValuesView(HashMapView):
+    """Live view of the values of a hash map."""
+
+    __slots__ = ()
+    _kind = ITER_VALUES
+
+    def __contains__(self, value: object) -> bool:
+        """Return True if some key maps to value. This walks the map."""
+        for other in self:
+            if other == value:
+                return True
+        return False
+
+
+class ItemsView(HashMapView):
+    """Live view of the (key, value) pairs of a hash map."""
+
+    __slots__ = ()
+    _kind = ITER_ITEMS
+
+    def __contains__(self, item: tuple) -> bool:
+        """Return True if item is a (key, value) pair of the map."""
+        key, value = item
+        return self._map.contains_key(key) and self._map.get(key) == value
+
+
 def hash_function_1(key: str) -> int:
     """Sample Hash function #1 to be used with HashMap implementation"""
     hash = 0
@@ -92,6 +173,239 @@ def hash_function_2(key: str) -> int:
     return hash
 
 
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+_FNV_OFFSET_64 = 0xCBF29CE484222325
+_FNV_PRIME_64 = 0x100000001B3
+
+
+def hash_function_fnv1a(key: str) -> int:
+    """64-bit FNV-1a hash of the UTF-8 bytes of key"""
+    hash = _FNV_OFFSET_64
+    for byte in key.encode():
+        hash = ((hash ^ byte) * _FNV_PRIME_64) & _MASK_64
+    return hash
+
+
+def _rotl_64(value: int, shift: int) -> int:
+    """Rotate a 64-bit integer left by shift bits"""
+    return ((value << shift) | (value >> (64 - shift))) & _MASK_64
+
+
+def _siphash_24(k0: int, k1: int, data: bytes) -> int:
+    """SipHash-2-4 of data under the 128-bit key (k0, k1)"""
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+
+    def rounds(count):
+        nonlocal v0, v1, v2, v3
+        for _ in range(count):
+            v0 = (v0 + v1) & _MASK_64
+            v1 = _rotl_64(v1, 13) ^ v0
+            v0 = _rotl_64(v0, 32)
+            v2 = (v2 + v3) & _MASK_64
+            v3 = _rotl_64(v3, 16) ^ v2
+            v0 = (v0 + v3) & _MASK_64
+            v3 = _rotl_64(v3, 21) ^ v0
+            v2 = (v2 + v1) & _MASK_64
+            v1 = _rotl_64(v1, 17) ^ v2
+            v2 = _rotl_64(v2, 32)
+
+    # Whole 8-byte words, then the tail padded with the length in the top byte.
+    length = len(data)
+    end = length - length % 8
+    for offset in range(0, end, 8):
+        word = int.from_bytes(data[offset:offset + 8], 'little')
+        v3 ^= word
+        rounds(2)
+        v0 ^= word
+    word = int.from_bytes(data[end:], 'little') | ((length & 0xFF) << 56)
+    v3 ^= word
+    rounds(2)
+    v0 ^= word
+
+    v2 ^= 0xFF
+    rounds(4)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def make_hash_function_siphash(secret: bytes = None) -> callable:
+    """
+    Return a SipHash-2-4 hash function keyed with a 16-byte secret.
+    A random secret is used if none is given.
+    """
+    if secret is None:
+        secret = os.urandom(16)
+    if len(secret) != 16:
+        raise ValueError("SipHash secret must be 16 bytes")
+    k0 = int.from_bytes(secret[:8], 'little')
+    k1 = int.from_bytes(secret[8:], 'little')
+
+    def hash_function_siphash(key: str) -> int:
+        """SipHash-2-4 of the UTF-8 bytes of key"""
+        return _siphash_24(k0, k1, key.encode())
+
+    return hash_function_siphash
+
+
+def make_hash_function_seeded(seed: int = None) -> callable:
+    """
+    Return a hash function built on Python's hash() and mixed with a seed, so each map can use its own seed.
+    A random seed is used if none is given. Like hash() itself, str results change between interpreter runs
+    unless PYTHONHASHSEED is set.
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'little')
+
+    def hash_function_seeded(key: str) -> int:
+        """hash() of key mixed with the seed"""
+        return hash((seed, key)) & _MASK_64
+
+    return hash_function_seeded
+
+
+def is_prime(capacity: int) -> bool:
+    """
+    Return True if capacity is a prime number. The same test as the maps' _is_prime, usable without a map.
+    """
+    if capacity == 2 or capacity == 3:
+        return True
+
+    if capacity == 1 or capacity % 2 == 0:
+        return False
+
+    factor = 3
+    while factor ** 2 <= capacity:
+        if capacity % factor == 0:
+            return False
+        factor += 2
+
+    return True
+
+
+def next_prime(capacity: int) -> int:
+    """
+    Return the smallest prime at or above capacity, as the maps' _next_prime does, usable without a map.
+    """
+    if capacity % 2 == 0:
+        capacity += 1
+
+    while not is_prime(capacity):
+        capacity += 2
+
+    return capacity
+
+
+# Hash functions a snapshot can name by id. Keyed and custom functions are stored as 0 and must be passed to load.
+_SNAPSHOT_FUNCTIONS = (None, hash_function_1, hash_function_2, hash_function_fnv1a)
+
+# Snapshot header: magic, hash function id, whether hashes are stored as an array('Q'), a map-specific id
+# (the probing strategy of an OA map), capacity, size, number of records and a CRC-32 of everything after the
+# header, then a CRC-32 of those fields so a damaged header is caught before its sizes are trusted.
+_SNAPSHOT_HEADER = struct.Struct('<8sBBBQQQI')
+_SNAPSHOT_CHECKSUM = struct.Struct('<I')
+
+# Bytes per record of the position array, and of the hash array when there is one.
+_SNAPSHOT_WORD = array('Q').itemsize
+
+
+def write_snapshot(path: str, magic: bytes, function: callable, extra: int, capacity: int, size: int,
+                   positions: array, states: bytes, hashes: list, keys: list, values: list) -> None:
+    """
+    Write a hash map snapshot: the header, then the bucket or slot index of each record as an array('Q'), one
+    state byte per record, the cached hashes as an array('Q') (or pickled with the keys if one does not fit in 64
+    bits), and finally the keys and values pickled as two lists.
+    """
+    function_id = _SNAPSHOT_FUNCTIONS.index(function) if function in _SNAPSHOT_FUNCTIONS else 0
+    try:
+        hash_array = array('Q', hashes)
+    except OverflowError:
+        hash_array = None
+    if hash_array is not None:
+        sections = (positions, states, hash_array)
+        payload = pickle.dumps((keys, values), pickle.HIGHEST_PROTOCOL)
+    else:
+        sections = (positions, states)
+        payload = pickle.dumps((keys, values, hashes), pickle.HIGHEST_PROTOCOL)
+    body_checksum = 0
+    for section in sections + (payload,):
+        body_checksum = zlib.crc32(section, body_checksum)
+
+    with open(path, 'wb') as file:
+        header = _SNAPSHOT_HEADER.pack(magic, function_id, hash_array is not None, extra, capacity, size,
+                                       len(positions), body_checksum)
+        file.write(header + _SNAPSHOT_CHECKSUM.pack(zlib.crc32(header)))
+        for section in sections:
+            file.write(section)
+        file.write(payload)
+
+
+def read_snapshot(path: str, magic: bytes, function: callable = None) -> tuple:
+    """
+    Read a snapshot written by write_snapshot and return (function, extra, capacity, size, positions, states,
+    hashes, keys, values). The fixed-width sections are read straight into preallocated arrays with readinto.
+    function is the hash function to use; if None, the one named in the snapshot is used.
+    Raise ValueError if the file is not a snapshot of this kind of map, is truncated or fails its checksums, or
+    the hash function does not match.
+    The keys and values are unpickled, and unpickling can run arbitrary code: only read snapshots from a
+    trusted source. The checksums catch damage, not tampering.
+    """
+    with open(path, 'rb') as file:
+        header = bytearray(_SNAPSHOT_HEADER.size + _SNAPSHOT_CHECKSUM.size)
+        if file.readinto(header) != len(header):
+            raise ValueError(path + " is not a hash map snapshot")
+        file_magic, function_id, hashes_in_array, extra, capacity, size, count, body_checksum = \
+            _SNAPSHOT_HEADER.unpack_from(header)
+        if file_magic != magic:
+            raise ValueError(path + " is not a snapshot of this kind of hash map")
+        checksum = _SNAPSHOT_CHECKSUM.unpack_from(header, _SNAPSHOT_HEADER.size)[0]
+        if checksum != zlib.crc32(header[:_SNAPSHOT_HEADER.size]) or function_id >= len(_SNAPSHOT_FUNCTIONS) \
+                or size > count:
+            raise ValueError(path + " is damaged")
+
+        # Check the record count against the file length before allocating anything for it.
+        fixed_width = count * (_SNAPSHOT_WORD + 1 + (_SNAPSHOT_WORD if hashes_in_array else 0))
+        if os.fstat(file.fileno()).st_size - len(header) < fixed_width:
+            raise ValueError(path + " is truncated")
+
+        if function is None:
+            if function_id == 0:
+                raise ValueError("snapshot was written with a custom hash function; pass it to load")
+            function = _SNAPSHOT_FUNCTIONS[function_id]
+        elif function_id != 0 and function is not _SNAPSHOT_FUNCTIONS[function_id]:
+            raise ValueError("snapshot was written with " + _SNAPSHOT_FUNCTIONS[function_id].__name__)
+
+        positions = array('Q', [0]) * count
+        states = bytearray(count)
+        hashes = array('Q', [0]) * count if hashes_in_array else None
+        sections = [(positions, count * _SNAPSHOT_WORD), (states, count)]
+        if hashes is not None:
+            sections.append((hashes, count * _SNAPSHOT_WORD))
+        checksum = 0
+        for section, length in sections:
+            if file.readinto(section) != length:
+                raise ValueError(path + " is truncated")
+            checksum = zlib.crc32(section, checksum)
+        payload = file.read()
+        if zlib.crc32(payload, checksum) != body_checksum:
+            raise ValueError(path + " is damaged")
+
+    try:
+        if hashes is not None:
+            keys, values = pickle.loads(payload)
+        else:
+            keys, values, hashes = pickle.loads(payload)
+        damaged = not len(keys) == len(values) == len(hashes) == count or (count and max(positions) >= capacity)
+    except Exception as exception:
+        # The checksum matched, so this is a snapshot that was written wrong, not one damaged on disk.
+        raise ValueError(path + " is damaged") from exception
+    if damaged:
+        raise ValueError(path + " is damaged")
+
+    return function, extra, capacity, size, positions, states, hashes, keys, values
+
+
 # --------- For use in Separate Chaining (SC) HashMap  --------- #
 
 class SLNode:
@@ -99,11 +413,14 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    __slots__ = ('key', 'value', 'next', 'hash')
+
+    def __init__(self, key: str, value: object, next: "SLNode" = None, hash: int = None) -> None:
+        """Initialize node given a key and value, and optionally the hash of the key."""
         self.key = key
         self.value = value
         self.next = next
+        self.hash = hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -164,20 +481,31 @@ class LinkedList:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
-        """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+    def head(self) -> SLNode:
+        """Return the first node of the list, or None if it is empty."""
+        return self._head
+
+    def insert(self, key: str, value: object, hash: int = None) -> None:
+        """Insert new node at front of the list, caching the hash of the key if given."""
+        self._head = SLNode(key, value, self._head, hash)
         self._size += 1
 
-    def remove(self, key: str) -> bool:
+    def insert_node(self, node: SLNode) -> None:
+        """Insert an existing node at front of the list."""
+        node.next = self._head
+        self._head = node
+        self._size += 1
+
+    def remove(self, key: str, hash: int = None) -> bool:
         """
         Remove first node with matching key.
+        If hash is given, nodes with a different cached hash are skipped without comparing keys.
         Return True if removal was successful, False otherwise.
         """
         previous, node = None, self._head
         while node:
 
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 if previous:
                     previous.next = node.next
                 else:
@@ -188,11 +516,14 @@ class LinkedList:
             previous, node = node, node.next
         return False
 
-    def contains(self, key: str) -> SLNode:
-        """Return node with matching key, or None if no match"""
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """
+        Return node with matching key, or None if no match.
+        If hash is given, nodes with a different cached hash are skipped without comparing keys.
+        """
         node = self._head
         while node:
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 return node
             node = node.next
         return node
@@ -206,10 +537,13 @@ class LinkedList:
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object) -> None:
-        """Initialize an entry for use in a hash map."""
+    __slots__ = ('key', 'value', 'hash', 'is_tombstone')
+
+    def __init__(self, key: str, value: object, hash: int = None) -> None:
+        """Initialize an entry for use in a hash map, caching the hash of the key if given."""
         self.key = key
         self.value = value
+        self.hash = hash
 
         # Set this value to True when you "delete" a HashEntry
         self.is_tombstone = False
@@ -0,0 +1,143 @@
+# Name: Mason Hunerkoch
+# Description: Hashing a batch of keys at once, vectorized with NumPy when it is installed.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from a6_include import _FNV_OFFSET_64, _FNV_PRIME_64, hash_function_1, hash_function_2, hash_function_fnv1a
+
+NUMPY_AVAILABLE = np is not None
+
+# Below this many keys the per-key loop beats the cost of building the NumPy arrays.
+_MIN_VECTOR_BATCH = 32
+
+# Most cells the padded key matrix may have, i.e. keys times the longest key. A batch with a few very long keys
+# would otherwise need a matrix far bigger than its keys; at 8 bytes a cell this caps it at 128 MiB.
+_MAX_VECTOR_CELLS = 1 << 24
+
+
+def _padded_matrix(keys: list, utf8: bool) -> tuple:
+    """
+    Returns the keys as a zero-padded matrix with one row per key, and the row lengths. The cells hold the UTF-8
+    bytes of each key (uint8) if utf8 is set, otherwise its code points (uint32), which is what ord() gives.
+    """
+    if utf8:
+        chunks = [key.encode() for key in keys]
+        flat = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+    else:
+        chunks = keys
+        flat = np.frombuffer(''.join(keys).encode('utf-32-le'), dtype=np.uint32)
+    lengths = np.fromiter(map(len, chunks), dtype=np.int64, count=len(chunks))
+
+    width = int(lengths.max()) if len(keys) else 0
+    matrix = np.zeros((len(keys), width), dtype=flat.dtype)
+    rows = np.repeat(np.arange(len(keys)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    matrix[rows, np.arange(flat.size) - np.repeat(starts, lengths)] = flat
+    return matrix, lengths
+
+
+def _hash_function_1(keys: list):
+    """hash_function_1 of every key: the sum of its code points."""
+    matrix, _ = _padded_matrix(keys, False)
+    return matrix.sum(axis=1, dtype=np.uint64)
+
+
+def _hash_function_2(keys: list):
+    """hash_function_2 of every key: the sum of (position + 1) * code point."""
+    matrix, _ = _padded_matrix(keys, False)
+    weights = np.arange(1, matrix.shape[1] + 1, dtype=np.uint64)
+    return (matrix.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+
+def _hash_function_fnv1a(keys: list):
+    """hash_function_fnv1a of every key, one byte column at a time across all keys."""
+    matrix, lengths = _padded_matrix(keys, True)
+    hashes = np.full(len(keys), _FNV_OFFSET_64, dtype=np.uint64)
+    prime = np.uint64(_FNV_PRIME_64)
+    with np.errstate(over='ignore'):
+        # uint64 arithmetic wraps around, which is the & _MASK_64 of the scalar version.
+        for column in range(matrix.shape[1]):
+            hashes = np.where(lengths > column, (hashes ^ matrix[:, column]) * prime, hashes)
+    return hashes
+
+
+# Vectorized versions of the hash functions, by the function they reproduce. The sums of hash_function_1 and
+# hash_function_2 are exact as long as they fit in 64 bits, i.e. for keys under about two million characters.
+_VECTORIZED = {
+    hash_function_1: _hash_function_1,
+    hash_function_2: _hash_function_2,
+    hash_function_fnv1a: _hash_function_fnv1a,
+}
+
+
+def _vector_hashes(function: callable, keys: list):
+    """
+    Returns the hashes of keys as a NumPy uint64 array, or None if the batch should be hashed one key at a time:
+    NumPy is missing, the batch is small, the function has no vectorized version, a key is not a str that
+    encodes cleanly, or the padded matrix of the keys would be too big.
+    """
+    if np is None or len(keys) < _MIN_VECTOR_BATCH or function not in _VECTORIZED:
+        return None
+    try:
+        if len(keys) * max(map(len, keys)) > _MAX_VECTOR_CELLS:
+            return None
+        return _VECTORIZED[function](keys)
+    except (AttributeError, TypeError, UnicodeEncodeError, MemoryError):
+        return None
+
+
+def hash_many(function: callable, keys) -> list:
+    """
+    Returns function(key) for every key, in order, as Python ints. With NumPy installed, batches hashed with
+    hash_function_1, hash_function_2 or hash_function_fnv1a are computed vectorized; anything else runs the
+    function once per key. Both paths give the same values.
+    """
+    keys = keys if isinstance(keys, list) else list(keys)
+    hashes = _vector_hashes(function, keys)
+    if hashes is not None:
+        return hashes.tolist()
+    return [function(key) for key in keys]
+
+
+def bucket_indices(function: callable, keys, capacity: int) -> list:
+    """
+    Returns function(key) % capacity for every key, in order, computed in one shot with NumPy when it can be.
+    """
+    keys = keys if isinstance(keys, list) else list(keys)
+    hashes = _vector_hashes(function, keys)
+    if hashes is not None:
+        return (hashes % np.uint64(capacity)).tolist()
+    return [function(key) % capacity for key in keys]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+    import random
+
+    print("\nparity of vectorized and per-key hashing")
+    print("----------------------------------------")
+    if not NUMPY_AVAILABLE:
+        print("NumPy is not installed; only the per-key fallback is checked")
+    rnd = random.Random(0)
+    alphabet = 'abcxyz0123456789_-é€日本😀'
+    keys = [''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(0, 40))) for _ in range(5000)]
+    keys += ['str' + str(i) for i in range(5000)]
+    for function in _VECTORIZED:
+        expected = [function(key) for key in keys]
+        if NUMPY_AVAILABLE:
+            assert _vector_hashes(function, keys) is not None, function.__name__
+        assert hash_many(function, keys) == expected, function.__name__
+        for capacity in (11, 53, 1009, 100003):
+            assert bucket_indices(function, keys, capacity) == [h % capacity for h in expected], function.__name__
+        print(function.__name__, 'ok')
+
+    # One long key makes the padded matrix too big, so the batch goes through the per-key path.
+    long_batch = keys + ['x' * (_MAX_VECTOR_CELLS // len(keys) + 1)]
+    assert _vector_hashes(hash_function_1, long_batch) is None
+    assert hash_many(hash_function_1, long_batch) == [hash_function_1(key) for key in long_batch]
+    print('oversized batch ok')
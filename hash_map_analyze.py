@@ -0,0 +1,248 @@
+# Name: Mason Hunerkoch
+# Description: Bucket distribution analysis for picking a capacity and a hash function before a map is built.
+
+import random
+import time
+
+import hash_batch
+import hash_map_oa
+import hash_map_sc
+from a6_include import HashEntry, hash_function_1, hash_function_2, hash_function_fnv1a, next_prime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Hash functions recommend compares by default. Keyed ones, e.g. from make_hash_function_siphash, can be passed in.
+CANDIDATES = {
+    'hash_function_1': hash_function_1,
+    'hash_function_2': hash_function_2,
+    'hash_function_fnv1a': hash_function_fnv1a,
+}
+
+# Hash functions whose expected lookup cost is within this share of the best one count as tied; the faster wins.
+_COST_TOLERANCE = 0.02
+
+# Most keys an open addressing report places one by one. Placing runs a Python loop per key (only the hashing
+# and counting are vectorized), so bigger samples are placed as a random subset of this many keys in a table
+# scaled down to the same load factor.
+PLACE_SAMPLE = 200000
+
+
+def recommended_capacity(count: int, engine: str = 'sc') -> int:
+    """
+    Returns the capacity that holds count keys without a resize: the same one from_items picks, i.e. load up to
+    1.0 for separate chaining ('sc') and below 0.5 for open addressing ('oa').
+    """
+    wanted = max(count, 11) if engine == 'sc' else max(2 * count + 1, 11)
+    return next_prime(wanted)
+
+
+def _home_buckets(function: callable, keys: list, capacity: int):
+    """
+    Returns the home bucket of every key, as a NumPy array when NumPy is installed, and the seconds the hashing
+    took. Hash functions hash_batch can vectorize are computed in one pass over all keys.
+    """
+    start = time.perf_counter()
+    hashes = hash_batch._vector_hashes(function, keys)
+    if hashes is not None:
+        homes = (hashes % np.uint64(capacity)).astype(np.int64)
+    else:
+        homes = [function(key) % capacity for key in keys]
+        if np is not None:
+            homes = np.array(homes, dtype=np.int64)
+    return homes, time.perf_counter() - start
+
+
+def _bucket_counts(homes, capacity: int):
+    """Returns the number of keys in each bucket."""
+    if np is not None:
+        return np.bincount(np.asarray(homes, dtype=np.int64), minlength=capacity)
+    counts = [0] * capacity
+    for home in homes:
+        counts[home] += 1
+    return counts
+
+
+def _summary(counts, count: int, capacity: int) -> dict:
+    """
+    Returns the distribution of keys over buckets: the chain lengths (length -> number of buckets), the longest
+    chain, the share of empty buckets, chi-squared over the degrees of freedom (about 1.0 for a uniform hash),
+    and the expected number of nodes a separate chaining lookup walks for a key that is in the map (hit) and for
+    one that is not but hashes like the keys do (miss).
+    """
+    expected = count / capacity
+    if np is not None:
+        counts = np.asarray(counts, dtype=np.int64)
+        squares = int((counts * counts).sum())
+        chains = {length: int(buckets) for length, buckets in enumerate(np.bincount(counts)) if buckets}
+        empty = int((counts == 0).sum())
+        longest = int(counts.max()) if capacity else 0
+    else:
+        squares = sum(bucket * bucket for bucket in counts)
+        chains = {}
+        for bucket in counts:
+            chains[bucket] = chains.get(bucket, 0) + 1
+        chains = dict(sorted(chains.items()))
+        empty = chains.get(0, 0)
+        longest = max(counts) if capacity else 0
+
+    # sum((c - e)^2) / e == sum(c^2) / e - 2 * count + capacity * e
+    chi_squared = (squares / expected - 2 * count + capacity * expected) if count else 0.0
+    return {
+        'keys': count,
+        'capacity': capacity,
+        'load': expected,
+        'lengths': chains,
+        'longest': longest,
+        'empty_share': empty / capacity,
+        'chi_squared': chi_squared / (capacity - 1) if capacity > 1 else 0.0,
+        # The i-th node of a chain takes i steps to reach, so a chain of c costs c(c + 1) / 2 over its keys.
+        'hit_cost': (squares + count) / 2 / count if count else 0.0,
+        # A missing key lands in a bucket with the same odds as the keys and walks all of its chain.
+        'miss_cost': squares / count if count else 0.0,
+    }
+
+
+def _probe_summary(report: dict, probes: dict) -> dict:
+    """Replaces the chain based figures of report with the probe lengths (length -> number of keys) of a table."""
+    count = sum(probes.values())
+    report['lengths'] = dict(sorted(probes.items()))
+    report['longest'] = max(probes) if probes else 0
+    report['hit_cost'] = sum(length * keys for length, keys in probes.items()) / count if count else 0.0
+    # Probe paths for missing keys depend on the strategy and are not estimated.
+    report['miss_cost'] = None
+    return report
+
+
+def _place(keys: list, homes, capacity: int, probing: hash_map_oa.ProbingStrategy) -> dict:
+    """
+    Places the keys into an open addressing table in order, the way put would, and returns their probe lengths
+    (length -> number of keys). This runs once per key, so bucket_report keeps it to PLACE_SAMPLE keys.
+    """
+    buckets = [None] * capacity
+    probes = {}
+    homes = homes.tolist() if np is not None else homes
+    for index in range(len(keys)):
+        # The home bucket stands in for the hash: the strategies only use it modulo the capacity.
+        length = probing.put(buckets, capacity, HashEntry(keys[index], None, homes[index]))[1]
+        probes[length] = probes.get(length, 0) + 1
+    return probes
+
+
+def bucket_report(function: callable, keys, capacity: int = None, engine: str = 'sc',
+                  probing: hash_map_oa.ProbingStrategy = None) -> dict:
+    """
+    Returns how the keys spread over capacity buckets with function (see _summary), plus the nanoseconds spent
+    hashing each key. capacity defaults to recommended_capacity. For open addressing ('oa') the lengths, longest
+    and hit_cost are probe lengths after placing the keys in order with probing (quadratic by default), and
+    'placed' is the number of keys placed: with more than PLACE_SAMPLE keys, a random PLACE_SAMPLE of them go
+    into a table with the same load factor, so the probe figures are estimates and the lengths count the sample.
+    """
+    keys = keys if isinstance(keys, list) else list(keys)
+    if capacity is None:
+        capacity = recommended_capacity(len(keys), engine)
+    homes, seconds = _home_buckets(function, keys, capacity)
+    report = _summary(_bucket_counts(homes, capacity), len(keys), capacity)
+    if engine == 'oa':
+        placed, placed_homes, placed_capacity = keys, homes, capacity
+        if len(keys) > PLACE_SAMPLE:
+            placed = random.Random(0).sample(keys, PLACE_SAMPLE)
+            placed_capacity = next_prime(capacity * PLACE_SAMPLE // len(keys) + 1)
+            placed_homes, _ = _home_buckets(function, placed, placed_capacity)
+        _probe_summary(report, _place(placed, placed_homes, placed_capacity, probing or hash_map_oa.QuadraticProbing()))
+        report['placed'] = len(placed)
+    report['hash_ns'] = seconds / len(keys) * 1e9 if keys else 0.0
+    return report
+
+
+def map_report(hash_map) -> dict:
+    """
+    Returns the layout of an existing hash_map_sc or hash_map_oa HashMap in the form of bucket_report, from the
+    hashes the map cached, without hashing anything. An incremental resize in progress is finished first.
+    Open addressing reports also give the number of tombstones.
+    """
+    hash_map._finish_migration()
+    buckets, capacity = hash_map._buckets, hash_map._capacity
+    if isinstance(hash_map, hash_map_sc.HashMap):
+        return _summary([buckets[index].length() for index in range(capacity)], hash_map._size, capacity)
+    if not isinstance(hash_map, hash_map_oa.HashMap):
+        raise TypeError("map_report needs a hash_map_sc or hash_map_oa HashMap")
+
+    homes = []
+    probes = {}
+    for index in range(capacity):
+        entry = buckets[index]
+        if entry is not None and entry.is_tombstone is False:
+            homes.append(entry.hash % capacity)
+            length = hash_map._probing.probe_length(buckets, capacity, index)
+            probes[length] = probes.get(length, 0) + 1
+    report = _probe_summary(_summary(_bucket_counts(homes, capacity), len(homes), capacity), probes)
+    report['tombstones'] = hash_map._tombstones
+    return report
+
+
+def recommend(keys, engine: str = 'sc', functions: dict = None, probing: hash_map_oa.ProbingStrategy = None) -> dict:
+    """
+    Analyzes a sample of keys with every hash function of functions (CANDIDATES by default) at the capacity
+    that holds them without a resize. Returns that capacity, the name of the recommended function and the
+    bucket_report of each function by name. The recommended function has the lowest expected cost per hit;
+    functions within 2% of it count as tied and the fastest to hash wins. Duplicate keys are counted once.
+    Open addressing costs come from placing at most PLACE_SAMPLE of the keys (see bucket_report).
+    """
+    keys = list(dict.fromkeys(keys))
+    capacity = recommended_capacity(len(keys), engine)
+    reports = {name: bucket_report(function, keys, capacity, engine, probing)
+               for name, function in (functions or CANDIDATES).items()}
+
+    best_cost = min(report['hit_cost'] for report in reports.values())
+    tied = [name for name, report in reports.items() if report['hit_cost'] <= best_cost * (1 + _COST_TOLERANCE)]
+    return {
+        'capacity': capacity,
+        'function': min(tied, key=lambda name: reports[name]['hash_ns']),
+        'reports': reports,
+    }
+
+
+def analyze(source, engine: str = 'sc', functions: dict = None) -> dict:
+    """
+    Analyzes a hash_map_sc or hash_map_oa HashMap, or a sample of keys. For a map the result of recommend on
+    its keys, for its engine and probing strategy, also has the map's current layout under 'current'.
+    """
+    if isinstance(source, hash_map_sc.HashMap):
+        return dict(recommend(source.keys(), 'sc', functions), current=map_report(source))
+    if isinstance(source, hash_map_oa.HashMap):
+        return dict(recommend(source.keys(), 'oa', functions, source._probing), current=map_report(source))
+    return recommend(source, engine, functions)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    def show(name: str, report: dict) -> None:
+        miss = 'n/a' if report['miss_cost'] is None else f"{report['miss_cost']:.2f}"
+        print(f"{name:<20} capacity={report['capacity']:<6} longest={report['longest']:<4} "
+              f"empty={report['empty_share']:.2f} chi2/df={report['chi_squared']:.2f} "
+              f"hit={report['hit_cost']:.2f} miss={miss}")
+
+    keys = ['key' + str(i) for i in range(5000)]
+    for engine in ('sc', 'oa'):
+        print(f"\nrecommend, engine {engine}")
+        print("-------------------")
+        result = analyze(keys, engine)
+        for name, report in result['reports'].items():
+            show(name, report)
+        print("recommended:", result['function'], result['capacity'])
+
+    print("\nexisting maps")
+    print("-------------")
+    for module in (hash_map_sc, hash_map_oa):
+        m = module.HashMap(11, hash_function_2)
+        for key in keys[:500]:
+            m.put(key, None)
+        result = analyze(m)
+        show(module.__name__, result['current'])
+        print("recommended:", result['function'], result['capacity'], result['current']['lengths'])
@@ -0,0 +1,678 @@
+# Name: Mason Hunerkoch
+# Description: Benchmarks for the separate chaining and open addressing hash maps.
+
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tempfile
+import threading
+import tracemalloc
+
+import hash_batch
+import hash_map_compact
+import hash_map_concurrent
+import hash_map_counter
+import hash_map_cuckoo
+import hash_map_mmap
+import hash_map_oa
+import hash_map_sc
+import hash_map_sharded
+import hash_map_swiss
+from a6_include import (DynamicArray, hash_function_1, hash_function_2, hash_function_fnv1a,
+                        make_hash_function_seeded, make_hash_function_siphash)
+
+
+def put_latency(hash_map, count: int) -> tuple[float, float]:
+    """
+    Puts count new keys into the map and returns the mean and the worst time of a single put, in microseconds.
+    """
+    clock = time.perf_counter
+    total = worst = 0.0
+    for i in range(count):
+        key = 'str' + str(i)
+        start = clock()
+        hash_map.put(key, i)
+        elapsed = clock() - start
+        total += elapsed
+        if elapsed > worst:
+            worst = elapsed
+    return total / count * 1e6, worst * 1e6
+
+
+def bench_incremental_resize(count: int = 200000, step: int = 8) -> None:
+    """Compares per-put latency of stop-the-world resizing against incremental resizing for both maps."""
+    for name, module in (('SC', hash_map_sc), ('OA', hash_map_oa)):
+        for incremental in (False, True):
+            m = module.HashMap(11, hash_function_2)
+            if incremental:
+                m.set_incremental_resize(step)
+            mean, worst = put_latency(m, count)
+            mode = 'incremental' if incremental else 'full'
+            print(f"{name} {mode:<11} n={count} mean={mean:.2f}us worst={worst:.0f}us")
+
+
+def hash_functions() -> dict:
+    """Returns the hash functions to compare, by name. The keyed ones use fixed seeds so runs are repeatable."""
+    return {
+        'hash_function_1': hash_function_1,
+        'hash_function_2': hash_function_2,
+        'fnv1a': hash_function_fnv1a,
+        'siphash': make_hash_function_siphash(bytes(range(16))),
+        'seeded': make_hash_function_seeded(12345),
+    }
+
+
+def key_sets(count: int) -> dict:
+    """Returns lists of string keys with different shapes, by name."""
+    # Every anagram key is a permutation of the same ten letters.
+    anagrams = [''.join(letters) for letters in itertools.islice(itertools.permutations('abcdefghij'), count)]
+    return {
+        'str': ['str' + str(i) for i in range(count)],
+        'key': ['key' + str(i) for i in range(count)],
+        'anagram': anagrams,
+    }
+
+
+def bucket_quality(hashes: list, capacity: int) -> tuple[int, float, float]:
+    """
+    Returns the longest chain, the share of empty buckets and the chi-squared statistic divided by the degrees of
+    freedom (about 1.0 for a uniform hash) when the hashes are placed into capacity buckets.
+    """
+    counts = [0] * capacity
+    for hash in hashes:
+        counts[hash % capacity] += 1
+    expected = len(hashes) / capacity
+    chi_squared = sum((count - expected) ** 2 for count in counts) / expected
+    return max(counts), counts.count(0) / capacity, chi_squared / (capacity - 1)
+
+
+def bench_hash_functions(count: int = 100000) -> None:
+    """Prints distribution quality and speed of each hash function on each key set."""
+    capacity = hash_map_sc.HashMap(count, hash_function_1).get_capacity()
+    for key_name, keys in key_sets(count).items():
+        for function_name, function in hash_functions().items():
+            start = time.perf_counter()
+            hashes = [function(key) for key in keys]
+            elapsed = time.perf_counter() - start
+            longest, empty, chi = bucket_quality(hashes, capacity)
+            print(f"{key_name:<8} {function_name:<16} {elapsed / count * 1e9:8.0f}ns/key "
+                  f"longest={longest:<6} empty={empty:.2f} chi2/df={chi:.2f}")
+
+
+def bench_memory(count: int = 100000) -> None:
+    """Prints the memory each map uses per entry, not counting the key and value objects themselves."""
+    keys = ['key' + str(i) for i in range(count)]
+    values = list(range(count))
+    for name, module in (('SC', hash_map_sc), ('OA', hash_map_oa), ('compact', hash_map_compact)):
+        tracemalloc.start()
+        m = module.HashMap(11, hash_function_fnv1a)
+        for i in range(count):
+            m.put(keys[i], values[i])
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name:<8} n={count} capacity={m.get_capacity()} {used / count:.1f} bytes/entry")
+
+
+def bench_tombstone_churn(live: int = 20000, operations: int = 200000) -> None:
+    """
+    Session-expiry churn: keeps `live` keys in the map, and each step removes the oldest key and puts a new one.
+    Runs with the default tombstone ratio and with ratio 1.0, where only the load trigger compacts the table.
+    """
+    for name, module in (('OA', hash_map_oa), ('compact', hash_map_compact)):
+        for ratio in (0.25, 1.0):
+            m = module.HashMap(11, hash_function_fnv1a)
+            m.set_max_tombstone_ratio(ratio)
+            for i in range(live):
+                m.put('session' + str(i), i)
+            start = time.perf_counter()
+            for i in range(live, live + operations):
+                m.remove('session' + str(i - live))
+                m.put('session' + str(i), i)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8} ratio={ratio:<4} {elapsed / operations * 1e6:.2f}us/step "
+                  f"capacity={m.get_capacity()} empty={m.empty_buckets()}")
+
+
+def bench_probing(count: int = 50000) -> None:
+    """Prints put/get time and probe lengths of the open addressing map under each probing strategy."""
+    strategies = (hash_map_oa.LinearProbing(), hash_map_oa.QuadraticProbing(),
+                  hash_map_oa.DoubleHashing(), hash_map_oa.RobinHoodHashing())
+    keys = ['key' + str(i) for i in range(count)]
+    for function_name in ('fnv1a', 'seeded'):
+        function = hash_functions()[function_name]
+        for probing in strategies:
+            m = hash_map_oa.HashMap(11, function)
+            m.set_probing(probing)
+            start = time.perf_counter()
+            for i in range(count):
+                m.put(keys[i], i)
+            put_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for i in range(count):
+                m.get(keys[i])
+            get_time = time.perf_counter() - start
+            average, longest = m.probe_stats()
+            print(f"{function_name:<16} {type(probing).__name__:<17} put={put_time / count * 1e6:.2f}us "
+                  f"get={get_time / count * 1e6:.2f}us probes avg={average:.2f} max={longest}")
+
+
+def bench_updates(keys: int = 1000, operations: int = 500000) -> None:
+    """
+    Update-heavy workload on the SC map: operations writes spread over a small set of keys, done as a plain put,
+    as get followed by put, and with increment and update_with.
+    """
+    names = ['key' + str(i % keys) for i in range(operations)]
+    workloads = (
+        ('put', lambda m, key: m.put(key, 1)),
+        ('get+put', lambda m, key: m.put(key, (m.get(key) or 0) + 1)),
+        ('increment', lambda m, key: m.increment(key)),
+        ('update_with', lambda m, key: m.update_with(key, lambda value: value + 1, 0)),
+    )
+    for name, update in workloads:
+        m = hash_map_sc.HashMap(11, hash_function_fnv1a)
+        start = time.perf_counter()
+        for key in names:
+            update(m, key)
+        elapsed = time.perf_counter() - start
+        print(f"SC {name:<12} keys={keys} {elapsed / operations * 1e6:.2f}us/update")
+
+
+def bench_counting(count: int = 1000000, distinct: int = 10000) -> None:
+    """
+    Times mode and top-k queries over count values drawn from `distinct` keys. find_mode is tied to
+    hash_function_1, which sums the characters and so piles these keys into few buckets; the counting map queries
+    run with it too and with FNV-1a.
+    """
+    rnd = random.Random(0)
+    values = ['key' + str(rnd.randrange(distinct)) for _ in range(count)]
+    da = DynamicArray(values)
+    queries = (
+        ('find_mode', lambda: hash_map_sc.find_mode(da)),
+        ('find_mode_stream', lambda: hash_map_counter.find_mode_stream(iter(values))),
+        ('find_mode_stream fnv1a', lambda: hash_map_counter.find_mode_stream(iter(values), hash_function_fnv1a)),
+        ('find_mode_stream fnv1a oa',
+         lambda: hash_map_counter.find_mode_stream(iter(values), hash_function_fnv1a, hash_map_oa)),
+        ('find_top_k k=10 fnv1a', lambda: hash_map_counter.find_top_k(da, 10, hash_function_fnv1a)),
+    )
+    for name, query in queries:
+        start = time.perf_counter()
+        query()
+        print(f"{name:<26} n={count} distinct={distinct} {time.perf_counter() - start:.2f}s")
+
+
+def bench_mmap(count: int = 200000, lookups: int = 100000) -> None:
+    """
+    Builds a memory-mapped map of count keys, then times a cold open (open plus the first lookup) and random
+    lookups, next to lookups in the in-memory open addressing map.
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    rnd = random.Random(0)
+    probes = [keys[rnd.randrange(count)] for _ in range(lookups)]
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.map')
+
+    with hash_map_mmap.HashMap(path, hash_function_fnv1a, 2 * count + 1) as m:
+        start = time.perf_counter()
+        for i in range(count):
+            m.put(keys[i], i)
+        build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    m = hash_map_mmap.HashMap(path, hash_function_fnv1a, readonly=True)
+    m.get(keys[0])
+    cold_open = time.perf_counter() - start
+    start = time.perf_counter()
+    for key in probes:
+        m.get(key)
+    mmap_get = time.perf_counter() - start
+    m.close()
+
+    oa = hash_map_oa.HashMap.from_items(((keys[i], i) for i in range(count)), hash_function_fnv1a)
+    start = time.perf_counter()
+    for key in probes:
+        oa.get(key)
+    oa_get = time.perf_counter() - start
+
+    size = os.path.getsize(path) + os.path.getsize(path + '.heap')
+    print(f"mmap n={count} files={size / 1e6:.1f}MB put={build / count * 1e6:.2f}us "
+          f"cold open={cold_open * 1e3:.2f}ms get={mmap_get / lookups * 1e6:.2f}us "
+          f"(in-memory OA get={oa_get / lookups * 1e6:.2f}us)")
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+def bench_snapshot(count: int = 500000) -> None:
+    """Compares restoring a map from a dump snapshot with rebuilding it by putting every pair again."""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.snapshot')
+    for name, module in (('SC', hash_map_sc), ('OA', hash_map_oa)):
+        m = module.HashMap(11, hash_function_fnv1a)
+        for i in range(count):
+            m.put('key' + str(i), i)
+
+        start = time.perf_counter()
+        m.dump(path)
+        dump_time = time.perf_counter() - start
+        start = time.perf_counter()
+        module.HashMap.load(path)
+        load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pairs = m.get_keys_and_values()
+        rebuilt = module.HashMap(11, hash_function_fnv1a)
+        for index in range(pairs.length()):
+            rebuilt.put(*pairs[index])
+        rebuild_time = time.perf_counter() - start
+        print(f"{name} n={count} file={os.path.getsize(path) / 1e6:.1f}MB dump={dump_time:.2f}s "
+              f"load={load_time:.2f}s rebuild by put={rebuild_time:.2f}s")
+    os.remove(path)
+    os.rmdir(directory)
+
+
+def bench_concurrent(operations: int = 400000, keys: int = 10000, thread_counts: tuple = (1, 2, 4, 8)) -> None:
+    """
+    Multi-threaded throughput of ConcurrentHashMap against LockedHashMap (one lock around the SC map):
+    each thread runs its share of operations, 80% get and 20% put over `keys` keys. With the GIL the threads
+    take turns; on a free-threaded build the lock striping lets them run in parallel.
+    """
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    names = ['key' + str(i) for i in range(keys)]
+    for map_class in (hash_map_concurrent.LockedHashMap, hash_map_concurrent.ConcurrentHashMap):
+        for threads in thread_counts:
+            m = map_class(11, hash_function_fnv1a)
+            for i in range(keys):
+                m.put(names[i], i)
+            share = operations // threads
+
+            def work(seed: int) -> None:
+                rnd = random.Random(seed)
+                for _ in range(share):
+                    key = names[rnd.randrange(keys)]
+                    if rnd.random() < 0.8:
+                        m.get(key)
+                    else:
+                        m.put(key, seed)
+
+            workers = [threading.Thread(target=work, args=(seed,)) for seed in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            print(f"{map_class.__name__:<18} gil={gil} threads={threads} {share * threads / elapsed:,.0f} ops/s")
+
+
+def bench_sharded(count: int = 200000, batch: int = 500, shard_counts: tuple = (1, 2, 4, 8)) -> None:
+    """
+    Batched put_many/get_many throughput of ShardedHashMap for each number of shards, next to the same batches
+    done key by key on one in-process OA map. Scaling needs at least as many free cores as shards.
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    batches = [keys[start:start + batch] for start in range(0, count, batch)]
+
+    m = hash_map_oa.HashMap(11, hash_function_fnv1a)
+    start = time.perf_counter()
+    for keys_batch in batches:
+        for key in keys_batch:
+            m.put(key, key)
+    put_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for keys_batch in batches:
+        [m.get(key) for key in keys_batch]
+    get_time = time.perf_counter() - start
+    print(f"in-process OA  cores={os.cpu_count()} put={count / put_time:,.0f}/s get={count / get_time:,.0f}/s")
+
+    for shards in shard_counts:
+        with hash_map_sharded.ShardedHashMap(shards, hash_function_fnv1a) as m:
+            start = time.perf_counter()
+            for keys_batch in batches:
+                m.put_many((key, key) for key in keys_batch)
+            put_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for keys_batch in batches:
+                m.get_many(keys_batch)
+            get_time = time.perf_counter() - start
+        print(f"sharded        shards={shards} batch={batch} put={count / put_time:,.0f}/s get={count / get_time:,.0f}/s")
+
+
+def bench_batch(count: int = 100000, requests: int = 400, batch: int = 500) -> None:
+    """
+    Request-handler pattern: each request looks up `batch` keys. Compares get called per key with one get_many
+    per request, and put per pair with put_many, for both maps.
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    rnd = random.Random(0)
+    lookups = [[keys[rnd.randrange(count)] for _ in range(batch)] for _ in range(requests)]
+    total = requests * batch
+    for name, module in (('SC', hash_map_sc), ('OA', hash_map_oa)):
+        m = module.HashMap(11, hash_function_fnv1a)
+        start = time.perf_counter()
+        for key in keys:
+            m.put(key, key)
+        put_time = time.perf_counter() - start
+        m = module.HashMap(11, hash_function_fnv1a)
+        start = time.perf_counter()
+        for first in range(0, count, batch):
+            m.put_many((key, key) for key in keys[first:first + batch])
+        put_many_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for request in lookups:
+            [m.get(key) for key in request]
+        get_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for request in lookups:
+            m.get_many(request)
+        get_many_time = time.perf_counter() - start
+        print(f"{name} batch={batch} put={put_time / count * 1e6:.2f}us put_many={put_many_time / count * 1e6:.2f}us "
+              f"get={get_time / total * 1e6:.2f}us get_many={get_many_time / total * 1e6:.2f}us per key")
+
+
+def bench_vector_hashing(count: int = 100000) -> None:
+    """Times hashing count keys one at a time against hash_batch.hash_many, which uses NumPy if installed."""
+    keys = ['key' + str(i) for i in range(count)]
+    for function in (hash_function_1, hash_function_2, hash_function_fnv1a):
+        start = time.perf_counter()
+        [function(key) for key in keys]
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        hash_batch.hash_many(function, keys)
+        batch_time = time.perf_counter() - start
+        print(f"{function.__name__:<20} numpy={hash_batch.NUMPY_AVAILABLE} per key={loop_time * 1e3:.0f}ms "
+              f"hash_many={batch_time * 1e3:.0f}ms for {count} keys")
+
+
+class _CountingKey(str):
+    """String key that counts how often it is compared for equality, see bench_swiss."""
+
+    comparisons = 0
+
+    def __eq__(self, other) -> bool:
+        _CountingKey.comparisons += 1
+        return str.__eq__(self, other)
+
+    __hash__ = str.__hash__
+
+
+def _builtin_hash(key: str) -> int:
+    """Python's own string hash as a non-negative 64-bit int. Fast, but it changes between runs."""
+    return hash(key) & 0xFFFFFFFFFFFFFFFF
+
+
+def bench_swiss(count: int = 100000) -> None:
+    """
+    Fills each open addressing map as far as it goes before growing (just under 7/8 for the Swiss table, 1/2 for
+    the others) and prints the time and the key comparisons per get, for keys that are there and keys that are
+    not, plus the slots looked at by the OA map. Uses Python's own string hash so the table dominates the time.
+    """
+    # Just under the Swiss table's 7/8 limit for a power-of-two capacity.
+    capacity = hash_map_swiss.HashMap._round_capacity(count * 8 // 7 + 1)
+    count = capacity * 7 // 8 - 1
+    keys = [_CountingKey('key' + str(i)) for i in range(count)]
+    missing = [_CountingKey('missing' + str(i)) for i in range(count)]
+    for name, module in (('OA', hash_map_oa), ('compact', hash_map_compact), ('swiss', hash_map_swiss)):
+        m = module.HashMap.from_items(((key, None) for key in keys), _builtin_hash)
+        line = f"{name:<8} load={m.table_load():.2f}"
+        for kind, lookups in (('hit', keys), ('miss', missing)):
+            if name == 'OA':
+                m.reset_probe_counters()
+            _CountingKey.comparisons = 0
+            start = time.perf_counter()
+            for key in lookups:
+                m.get(key)
+            elapsed = time.perf_counter() - start
+            line += f" {kind}={elapsed / count * 1e9:.0f}ns {_CountingKey.comparisons / count:.3f} compares"
+            if name == 'OA':
+                line += f" {m.probe_counters()[0]:.2f} slots"
+        print(line + " per get")
+
+
+def _percentiles(latencies: list) -> str:
+    """Returns the median, 99th, 99.9th percentile and worst of a list of latencies in nanoseconds, as text."""
+    latencies = sorted(latencies)
+    last = len(latencies) - 1
+    return (f"p50={latencies[last // 2]}ns p99={latencies[last * 99 // 100]}ns "
+            f"p99.9={latencies[last * 999 // 1000]}ns max={latencies[last]}ns")
+
+
+def bench_cuckoo(count: int = 100000, load: float = 0.45) -> None:
+    """
+    Tail latency of single lookups: the OA map with quadratic probing against the cuckoo map, both built with the
+    same capacity and filled to the same load. Each get is timed on its own with the garbage collector off.
+    Prints the percentiles for keys that are there and keys that are not, and the longest OA probe.
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+    capacity = int(count / load)
+    clock = time.perf_counter_ns
+    for name, m in (('OA', hash_map_oa.HashMap(capacity, _builtin_hash)),
+                    ('cuckoo', hash_map_cuckoo.HashMap(capacity, _builtin_hash))):
+        for key in keys:
+            m.put(key, None)
+        line = f"{name:<7} load={m.table_load():.3f}"
+        gc.disable()
+        try:
+            for kind, lookups in (('hit', keys), ('miss', missing)):
+                latencies = []
+                for key in lookups:
+                    start = clock()
+                    m.get(key)
+                    latencies.append(clock() - start)
+                line += f" {kind}: {_percentiles(latencies)}"
+        finally:
+            gc.enable()
+        if name == 'OA':
+            line += f" longest probe={m.probe_stats()[1]}"
+        print(line)
+
+
+def bench_lookup(count: int = 100000, repeats: int = 5) -> None:
+    """
+    Lookup micro-benchmark for the SC and OA maps: the ns per get for keys that are there (hit) and keys that
+    are not (miss), and the ms for one resize_table to double the capacity. Each get loop runs repeats times
+    and the median is printed. Uses Python's own string hash so the bucket access dominates the time; run it
+    before and after a change to the maps' hot paths to compare.
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+    clock = time.perf_counter
+    for name, module in (('SC', hash_map_sc), ('OA', hash_map_oa)):
+        m = module.HashMap(11, _builtin_hash)
+        for key in keys:
+            m.put(key, key)
+        line = f"{name} n={count}"
+        for kind, lookups in (('hit', keys), ('miss', missing)):
+            times = []
+            for _ in range(repeats):
+                start = clock()
+                for key in lookups:
+                    m.get(key)
+                times.append((clock() - start) / count * 1e9)
+            line += f" get {kind}={sorted(times)[repeats // 2]:.0f}ns"
+        start = clock()
+        m.resize_table(m.get_capacity() * 2)
+        print(line + f" resize={(clock() - start) * 1e3:.0f}ms")
+
+
+# ------------------- BENCHMARK SUITE ---------------------------------------- #
+
+MAPS = {'sc': hash_map_sc, 'oa': hash_map_oa, 'compact': hash_map_compact, 'swiss': hash_map_swiss,
+        'cuckoo': hash_map_cuckoo}
+DISTRIBUTIONS = ('sequential', 'random', 'zipf', 'anagram')
+
+# Anagram keys collide under hash_function_1 and hash_function_2, so loading n of them takes O(n^2) time.
+# The suite stops the anagram runs at this many keys unless a larger limit is asked for.
+ANAGRAM_MAX_SIZE = 2000
+
+
+def make_keys(distribution: str, count: int, seed: int = 0) -> list:
+    """
+    Returns count keys drawn from a distribution:
+    sequential 'key0', 'key1', ...; random 12-digit ids; zipf draws (s = 1.1) from count sequential keys,
+    so popular keys repeat; anagram permutations of the same twelve letters, which all collide under
+    hash_function_1.
+    """
+    rnd = random.Random(seed)
+    if distribution == 'sequential':
+        return ['key' + str(i) for i in range(count)]
+    if distribution == 'random':
+        return ['id' + str(rnd.randrange(10 ** 12)) for _ in range(count)]
+    if distribution == 'zipf':
+        population = ['key' + str(i) for i in range(count)]
+        cum_weights = list(itertools.accumulate(1 / (rank ** 1.1) for rank in range(1, count + 1)))
+        return rnd.choices(population, cum_weights=cum_weights, k=count)
+    if distribution == 'anagram':
+        permutations = itertools.permutations('abcdefghijkl')
+        return [''.join(letters) for letters in itertools.islice(permutations, count)]
+    raise ValueError("unknown key distribution: " + distribution)
+
+
+def _rate(count: int, elapsed: float) -> float:
+    """Returns operations per second."""
+    return count / elapsed if elapsed > 0 else float('inf')
+
+
+def run_case(map_name: str, function_name: str, distribution: str, count: int, seed: int = 0) -> dict:
+    """
+    Runs one map with one hash function over count keys and returns operations per second for put, get,
+    contains_key (hits and misses) and remove, plus the time of one resize_table, one walk over
+    get_keys_and_values and, for the SC map, one find_mode over the keys.
+    """
+    module = MAPS[map_name]
+    keys = make_keys(distribution, count, seed)
+    missing = ['missing' + str(i) for i in range(count)]
+    clock = time.perf_counter
+    result = {'map': map_name, 'function': function_name, 'distribution': distribution, 'size': count}
+
+    m = module.HashMap(11, hash_functions()[function_name])
+    start = clock()
+    for i in range(count):
+        m.put(keys[i], i)
+    result['put_ops'] = _rate(count, clock() - start)
+
+    start = clock()
+    for key in keys:
+        m.get(key)
+    result['get_ops'] = _rate(count, clock() - start)
+
+    start = clock()
+    for key in keys:
+        m.contains_key(key)
+    result['contains_hit_ops'] = _rate(count, clock() - start)
+
+    start = clock()
+    for key in missing:
+        m.contains_key(key)
+    result['contains_miss_ops'] = _rate(count, clock() - start)
+
+    start = clock()
+    pairs = m.get_keys_and_values()
+    for index in range(pairs.length()):
+        pairs[index]
+    result['iterate_seconds'] = clock() - start
+
+    result['final_capacity'] = m.get_capacity()
+    start = clock()
+    m.resize_table(m.get_capacity() * 2)
+    result['resize_seconds'] = clock() - start
+
+    start = clock()
+    for key in keys:
+        m.remove(key)
+    result['remove_ops'] = _rate(count, clock() - start)
+
+    if map_name == 'sc':
+        start = clock()
+        hash_map_sc.find_mode(DynamicArray(keys))
+        result['find_mode_seconds'] = clock() - start
+    return result
+
+
+def run_suite(sizes: list, maps: list, functions: list, distributions: list, seed: int = 0,
+              anagram_max_size: int = ANAGRAM_MAX_SIZE) -> dict:
+    """
+    Runs every combination of the arguments and returns the results with details of the run. Anagram runs with
+    more than anagram_max_size keys are skipped and listed under 'skipped'; a limit of None runs them all.
+    """
+    results = []
+    skipped = []
+    for count in sizes:
+        for distribution in distributions:
+            if distribution == 'anagram' and anagram_max_size is not None and count > anagram_max_size:
+                skipped.append({'distribution': distribution, 'size': count})
+                continue
+            for map_name in maps:
+                for function_name in functions:
+                    results.append(run_case(map_name, function_name, distribution, count, seed))
+    return {
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point: runs the suite and writes the results as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark the hash maps and write JSON results.")
+    # hash_function_1 and hash_function_2 collide a lot on every key distribution here, so runs with 100000 keys
+    # and more take minutes each; they are left to an explicit --sizes.
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help="numbers of keys, e.g. 1000 10000000")
+    parser.add_argument('--maps', nargs='+', choices=sorted(MAPS), default=['sc', 'oa'])
+    parser.add_argument('--functions', nargs='+', choices=sorted(hash_functions()),
+                        default=['hash_function_1', 'hash_function_2'])
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument('--anagram-max-size', type=int, default=ANAGRAM_MAX_SIZE,
+                        help="largest size to run the anagram keys at, 0 for no limit (those runs are quadratic)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="file to write, standard output if not given")
+    parser.add_argument('--extras', action='store_true',
+                        help="also run the resize, hash function, memory, tombstone and probing benchmarks, "
+                             "printed to standard error")
+    args = parser.parse_args(argv)
+
+    if args.extras:
+        # The extras print plain text, so it goes to standard error and standard output holds only the JSON.
+        with contextlib.redirect_stdout(sys.stderr):
+            bench_incremental_resize()
+            bench_hash_functions()
+            bench_memory()
+            bench_tombstone_churn()
+            bench_probing()
+            bench_updates()
+            bench_counting()
+            bench_mmap()
+            bench_snapshot()
+            bench_concurrent()
+            bench_sharded()
+            bench_batch()
+            bench_vector_hashing()
+            bench_swiss()
+            bench_cuckoo()
+            bench_lookup()
+
+    report = run_suite(args.sizes, args.maps, args.functions, args.distributions, args.seed,
+                       args.anagram_max_size or None)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# Name: Mason Hunerkoch
+# Description: Open addressing hash map that keeps its slots in parallel arrays instead of HashEntry objects.
+
+from array import array
+
+from hash_map_oa import ProbeLimitException
+from a6_include import (ITER_ITEMS, ITER_KEYS, ITER_VALUES, DynamicArray, HashEntry, HashMapModifiedException,
+                        ItemsView, KeysView, ValuesView, hash_function_1, hash_function_2, is_prime, next_prime)
+
+# Slot states stored in the state byte array.
+_EMPTY = 0
+_OCCUPIED = 1
+_TOMBSTONE = 2
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# What a HashMapIterator yields besides ITER_KEYS, ITER_VALUES and ITER_ITEMS.
+_ENTRIES = 3
+
+
+class HashMapIterator:
+    """
+    Iterator over the keys, values, (key, value) items or HashEntry copies of the occupied slots of a HashMap.
+    Raises HashMapModifiedException if a key is added or removed, or the table is rebuilt, while it runs.
+    """
+
+    __slots__ = ('_map', '_modifications', '_kind', '_index')
+
+    def __init__(self, hash_map: "HashMap", kind: int) -> None:
+        """Initialize the iterator at the first slot."""
+        self._map = hash_map
+        self._modifications = hash_map._modifications
+        self._kind = kind
+        self._index = 0
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next key, value, item or entry and advance the iterator."""
+        hash_map = self._map
+        if hash_map._modifications != self._modifications:
+            raise HashMapModifiedException("HashMap changed during iteration")
+
+        states, capacity, index = hash_map._states, hash_map._capacity, self._index
+        while index < capacity and states[index] != _OCCUPIED:
+            index += 1
+        if index >= capacity:
+            self._index = index
+            raise StopIteration
+        self._index = index + 1
+        if self._kind == ITER_KEYS:
+            return hash_map._keys[index]
+        if self._kind == ITER_VALUES:
+            return hash_map._values[index]
+        if self._kind == ITER_ITEMS:
+            return hash_map._keys[index], hash_map._values[index]
+        return hash_map._entry(index)
+
+
+class HashMap:
+    """
+    Open addressing HashMap with quadratic probing and the same interface as hash_map_oa.HashMap.
+    Slot data lives in parallel arrays: cached hashes in an array('Q'), keys and values in lists
+    and the empty/occupied/tombstone state in a bytearray.
+    Hashes are reduced to 64 bits before use so they fit the hash array.
+    """
+
+    __slots__ = ('_capacity', '_hash_function', '_size', '_modifications', '_tombstones', '_max_tombstone_ratio',
+                 '_hashes', '_keys', '_values', '_states')
+
+    # The same prime search as the separate chaining and open addressing maps.
+    _next_prime = staticmethod(next_prime)
+    _is_prime = staticmethod(is_prime)
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses
+        quadratic probing for collision resolution
+        """
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        self._hash_function = function
+        self._size = 0
+        self._modifications = 0
+        self._tombstones = 0
+        self._max_tombstone_ratio = 0.25
+        self._allocate()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            out += str(i) + ': ' + str(self._entry(i)) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def from_items(cls, iterable, function, expected_size: int = None) -> "HashMap":
+        """
+        Builds a new map from an iterable of (key, value) pairs. The capacity is sized once from the number of
+        pairs (or expected_size if larger) so no resize happens during the load.
+        """
+        pairs = list(iterable)
+        if expected_size is None or expected_size < len(pairs):
+            expected_size = len(pairs)
+
+        new_map = cls(max(2 * expected_size + 1, 11), function)
+        for key, value in pairs:
+            new_map.put(key, value)
+        return new_map
+
+    def put(self, key: str, value: object) -> None:
+        """
+        First this method will check if the load factor is 0.5 or greater and resize if so.
+        Next, adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
+        """
+        # Check table load is less than 0.5
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+        elif (self._size + self._tombstones) / self._capacity >= 0.5:
+            # Mostly tombstones: rehash at the same size so at most half the slots stay in use.
+            self.compact()
+
+        hash = self._hash_function(key) & _MASK_64
+        try:
+            index = self._insert_index(hash % self._capacity, key, hash)
+        except ProbeLimitException:
+            # No free slot on this key's probe path: drop the tombstones, or grow if there are none, and retry.
+            if self._tombstones:
+                self.compact()
+            else:
+                self.resize_table(self._capacity * 2)
+            self.put(key, value)
+            return
+        if self._states[index] != _OCCUPIED:
+            if self._states[index] == _TOMBSTONE:
+                self._tombstones -= 1
+            self._size += 1
+            self._modifications += 1
+            self._hashes[index] = hash
+            self._keys[index] = key
+            self._states[index] = _OCCUPIED
+        self._values[index] = value
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the table if the size passed is at least the number of entries. The function will verify the size
+        is a prime number and if not, resize the table to the next prime number.
+        """
+        # Verify new_capacity is a valid prime number.
+        if new_capacity < self._size:
+            return
+        if not self._is_prime(new_capacity):
+            new_capacity = self._next_prime(new_capacity)
+
+        # Grow the same way re-putting every pair would, so the load stays below 0.5.
+        while (self._size - 1) / new_capacity >= 0.5:
+            new_capacity = self._next_prime(new_capacity * 2)
+
+        # Move the occupied slots straight from the old arrays into new ones using their cached hashes.
+        # If a probe path fills up the capacity is doubled and placement starts over.
+        old_hashes, old_keys, old_values, old_states = self._hashes, self._keys, self._values, self._states
+        old_capacity = self._capacity
+        while True:
+            self._capacity = new_capacity
+            self._allocate()
+            try:
+                for old_index in range(old_capacity):
+                    if old_states[old_index] == _OCCUPIED:
+                        hash, key = old_hashes[old_index], old_keys[old_index]
+                        index = self.quadratic_prob(hash % new_capacity, key, hash)
+                        self._hashes[index] = hash
+                        self._keys[index] = key
+                        self._values[index] = old_values[old_index]
+                        self._states[index] = _OCCUPIED
+                break
+            except ProbeLimitException:
+                new_capacity = self._next_prime(new_capacity * 2)
+        self._tombstones = 0
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor the map.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets within the map. Tombstones are not empty, since probes still walk
+        through them.
+        """
+        return self._capacity - self._size - self._tombstones
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the key or None if the key is not in the map.
+        """
+        index = self._find(key, self._hash_function(key) & _MASK_64)
+        if index < 0:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True or False based on whether or not the key is in the map.
+        """
+        return self._find(key, self._hash_function(key) & _MASK_64) >= 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a key from the map.
+        """
+        index = self._find(key, self._hash_function(key) & _MASK_64)
+        if index >= 0:
+            self._states[index] = _TOMBSTONE
+            self._keys[index] = None
+            self._values[index] = None
+            self._size -= 1
+            self._modifications += 1
+            self._tombstones += 1
+            if self._tombstones / self._capacity >= self._max_tombstone_ratio:
+                self.compact()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
+        """
+        our_array = DynamicArray()
+        for index in range(self._capacity):
+            if self._states[index] == _OCCUPIED:
+                our_array.append((self._keys[index], self._values[index]))
+        return our_array
+
+    def clear(self) -> None:
+        """
+        Clears the hash map.
+        """
+        self._allocate()
+        self._size = 0
+        self._tombstones = 0
+
+    def keys(self) -> KeysView:
+        """Returns a live view of the keys of the map."""
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """Returns a live view of the values of the map."""
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """Returns a live view of the (key, value) pairs of the map."""
+        return ItemsView(self)
+
+    def _iterator(self, kind: int) -> HashMapIterator:
+        """Returns a new iterator over the map, see HashMapIterator."""
+        return HashMapIterator(self, kind)
+
+    def __iter__(self) -> HashMapIterator:
+        """
+        Iterator for loop. Yields each occupied slot as a HashEntry; each loop gets its own iterator.
+        """
+        return HashMapIterator(self, _ENTRIES)
+
+    def quadratic_prob(self, index: int, key: str, hash: int) -> int:
+        """
+        Finds the occupied slot holding key, or the first empty slot, via quadratic probing.
+        Slots with a different cached hash are skipped without comparing keys.
+        Raises ProbeLimitException once the probes start repeating without finding either.
+        """
+        states, hashes, keys = self._states, self._hashes, self._keys
+        # With a prime capacity the first capacity // 2 + 1 probes are distinct, then they repeat.
+        limit = self._capacity // 2 + 1
+        counter = 0
+        original_index = index
+        while states[index] != _EMPTY:
+            if states[index] == _OCCUPIED and hashes[index] == hash and keys[index] == key:
+                return index
+            counter += 1
+            if counter == limit:
+                raise ProbeLimitException
+            index = (original_index + counter * counter) % self._capacity
+        return index
+
+    def _find(self, key: str, hash: int) -> int:
+        """Returns the occupied slot holding key, or -1 if the key is not in the map."""
+        try:
+            index = self.quadratic_prob(hash % self._capacity, key, hash)
+        except ProbeLimitException:
+            return -1
+        return index if self._states[index] == _OCCUPIED else -1
+
+    def _insert_index(self, index: int, key: str, hash: int) -> int:
+        """
+        Finds where to put key via quadratic probing: the slot holding key if there is one, otherwise the first
+        tombstone passed on the way, otherwise the first empty slot.
+        Raises ProbeLimitException if the probes start repeating before any of those turns up.
+        """
+        states, hashes, keys = self._states, self._hashes, self._keys
+        limit = self._capacity // 2 + 1
+        counter = 0
+        original_index = index
+        first_tombstone = None
+        while states[index] != _EMPTY:
+            if states[index] == _TOMBSTONE:
+                if first_tombstone is None:
+                    first_tombstone = index
+            elif hashes[index] == hash and keys[index] == key:
+                return index
+            counter += 1
+            if counter == limit:
+                if first_tombstone is None:
+                    raise ProbeLimitException
+                return first_tombstone
+            index = (original_index + counter * counter) % self._capacity
+        return index if first_tombstone is None else first_tombstone
+
+    def compact(self) -> None:
+        """Rehashes the entries at the same capacity, which drops every tombstone."""
+        self.resize_table(self._capacity)
+
+    def set_max_tombstone_ratio(self, ratio: float) -> None:
+        """Sets the share of slots tombstones may fill before remove compacts the table."""
+        self._max_tombstone_ratio = ratio
+
+    def _allocate(self) -> None:
+        """Creates empty slot arrays for the current capacity."""
+        capacity = self._capacity
+        self._modifications += 1
+        self._hashes = array('Q', [0]) * capacity
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._states = bytearray(capacity)
+
+    def _entry(self, index: int) -> HashEntry:
+        """Returns the slot at index as a HashEntry, or None if it is empty."""
+        if self._states[index] == _EMPTY:
+            return None
+        entry = HashEntry(self._keys[index], self._values[index], self._hashes[index])
+        entry.is_tombstone = self._states[index] == _TOMBSTONE
+        return entry
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nput, get and remove")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    m.remove('str0')
+    print(m.get('str0'), m.get('str1'), m.contains_key('str0'), m.contains_key('str149'))
+
+    print("\nget_keys_and_values")
+    print("-------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    m.remove('1')
+    m.resize_table(12)
+    print(m.get_keys_and_values())
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
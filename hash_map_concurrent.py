@@ -0,0 +1,297 @@
+# Name: Mason Hunerkoch
+# Description: Thread-safe separate chaining hash maps: lock striping over one table, and a single-lock baseline.
+
+import threading
+
+import hash_map_sc
+from a6_include import DynamicArray, DynamicArrayException, hash_function_1, hash_function_2
+
+
+class ConcurrentHashMap:
+    """
+    Separate chaining HashMap that many threads can share. The table is a hash_map_sc.HashMap; its buckets are
+    split into stripes (bucket index % stripes) and each stripe has its own lock, so writers to different stripes
+    run at the same time. Each stripe keeps its own count of keys, so the size is never updated from two threads.
+
+    A resize takes the resize lock and then every stripe lock, so it is the only operation that stops the whole
+    map. get and contains_key take no lock: they read the bucket directly and check a version number that every
+    resize bumps (odd while a resize runs). If a resize happened during the read it is retried under the stripe
+    lock. Readers racing a put or remove in the same chain see the map from just before or just after it.
+    This relies on single attribute and list reads being atomic, which holds with the GIL and in free-threaded
+    CPython builds.
+    """
+
+    def __init__(self, capacity: int = 11, function: callable = hash_function_1, stripes: int = 16) -> None:
+        """Initialize an empty map with the given number of lock stripes."""
+        self._map = hash_map_sc.HashMap(capacity, function)
+        self._hash_function = function
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._sizes = [0] * stripes
+        self._resize_lock = threading.Lock()
+        self._version = 0
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(self._sizes)
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._map._capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor the map.
+        """
+        return self.get_size() / self._map._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
+        The table is resized once the load factor reaches 1.0.
+        """
+        self._upsert(key, value, None)
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of key. If the key is not in the map, it is added with the value default first.
+        The check and the insert happen under one lock.
+        """
+        return self._upsert(key, default, lambda value: value)
+
+    def update_with(self, key: str, fn: callable, default: object = None) -> object:
+        """
+        Replaces the value of key with fn(value) under the stripe lock and returns the new value.
+        A missing key starts from default.
+        """
+        return self._upsert(key, default, fn, True)
+
+    def increment(self, key: str, delta: int = 1) -> object:
+        """
+        Adds delta to the value of key under the stripe lock and returns the new value. A missing key starts
+        from 0.
+        """
+        return self._upsert(key, 0, lambda value: value + delta, True)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the key or None if the key is not in the map. Takes no lock unless a
+        resize gets in the way.
+        """
+        node = self._find(key)
+        return None if node is None else node.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map. Takes no lock unless a resize gets in the way.
+        """
+        return self._find(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key from the map if applicable.
+        """
+        hash = self._hash_function(key)
+        stripe, bucket = self._lock_bucket(hash)
+        try:
+            if bucket.remove(key, hash):
+                self._sizes[stripe] -= 1
+        finally:
+            self._locks[stripe].release()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the table the same way hash_map_sc.HashMap.resize_table does, holding every lock.
+        """
+        with self._resize_lock:
+            self._resize(new_capacity)
+
+    def clear(self) -> None:
+        """
+        Clears the hash map.
+        """
+        with self._resize_lock:
+            self._stop_the_world(self._clear)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array of the key value pairs in the map, taken while every lock is held so it is a
+        consistent snapshot.
+        """
+        with self._resize_lock:
+            return self._stop_the_world(self._map.get_keys_and_values)
+
+    # ------------------------------------------------------------------ #
+
+    def _lock_bucket(self, hash: int) -> tuple:
+        """
+        Locks the stripe of the bucket for hash and returns the stripe index and the bucket. The caller releases
+        self._locks[stripe]. If a resize changed the capacity before the lock was taken, it tries again.
+        """
+        table, locks = self._map, self._locks
+        while True:
+            capacity = table._capacity
+            stripe = hash % capacity % len(locks)
+            locks[stripe].acquire()
+            if table._capacity == capacity:
+                return stripe, table._buckets[hash % capacity]
+            locks[stripe].release()
+
+    def _upsert(self, key: str, value: object, fn: callable, apply_to_existing: bool = False) -> object:
+        """
+        Inserts key with value if it is missing. Otherwise replaces its value with value (fn is None) or with
+        fn(value). A new key gets fn(value) too if apply_to_existing is set. Returns the final value.
+        """
+        hash = self._hash_function(key)
+        stripe, bucket = self._lock_bucket(hash)
+        try:
+            node = bucket.contains(key, hash)
+            inserted = node is None
+            if inserted:
+                bucket.insert(key, value, hash)
+                node = bucket.head()
+                self._sizes[stripe] += 1
+                if apply_to_existing:
+                    node.value = fn(node.value)
+            elif fn is None:
+                node.value = value
+            else:
+                node.value = fn(node.value)
+            result = node.value
+        finally:
+            self._locks[stripe].release()
+
+        if inserted and sum(self._sizes) >= self._map._capacity:
+            with self._resize_lock:
+                # Another thread may have grown the table while this one waited.
+                if sum(self._sizes) >= self._map._capacity:
+                    self._resize(self._map._capacity * 2)
+        return result
+
+    def _find(self, key: str):
+        """Returns the node for key, or None. Reads without a lock and falls back to the stripe lock."""
+        hash = self._hash_function(key)
+        table = self._map
+        version = self._version
+        if version % 2 == 0:
+            try:
+                node = table._buckets[hash % table._capacity].contains(key, hash)
+                if self._version == version:
+                    return node
+            except DynamicArrayException:
+                # The table was swapped between reading its capacity and its buckets.
+                pass
+
+        stripe, bucket = self._lock_bucket(hash)
+        try:
+            return bucket.contains(key, hash)
+        finally:
+            self._locks[stripe].release()
+
+    def _stop_the_world(self, operation: callable):
+        """Runs operation while holding every stripe lock, bumping the version around it. The caller holds the
+        resize lock, so stripe locks are always taken in the same order."""
+        for lock in self._locks:
+            lock.acquire()
+        self._version += 1
+        try:
+            return operation()
+        finally:
+            self._version += 1
+            for lock in self._locks:
+                lock.release()
+
+    def _resize(self, new_capacity: int) -> None:
+        """Resizes the table while holding every lock. The caller holds the resize lock."""
+        def resize():
+            self._map._size = sum(self._sizes)
+            self._map.resize_table(new_capacity)
+        self._stop_the_world(resize)
+
+    def _clear(self) -> None:
+        """Empties the table and the stripe counts. Runs with every lock held."""
+        self._map.clear()
+        self._sizes = [0] * len(self._locks)
+
+
+class LockedHashMap:
+    """
+    hash_map_sc.HashMap behind one lock: every call holds the same lock for its whole length.
+    The simple baseline ConcurrentHashMap is measured against.
+    """
+
+    def __init__(self, capacity: int = 11, function: callable = hash_function_1) -> None:
+        """Initialize an empty map."""
+        self._map = hash_map_sc.HashMap(capacity, function)
+        self._lock = threading.Lock()
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._map.get_capacity()
+
+    def put(self, key: str, value: object) -> None:
+        """Adds or overwrites a key value pair."""
+        with self._lock:
+            self._map.put(key, value)
+
+    def increment(self, key: str, delta: int = 1) -> object:
+        """Adds delta to the value of key and returns the new value. A missing key starts from 0."""
+        with self._lock:
+            return self._map.increment(key, delta)
+
+    def get(self, key: str) -> object:
+        """Returns the value associated with the key or None."""
+        with self._lock:
+            return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """Returns True if the given key is in the hash map."""
+        with self._lock:
+            return self._map.contains_key(key)
+
+    def remove(self, key: str) -> None:
+        """Removes the given key from the map if applicable."""
+        with self._lock:
+            self._map.remove(key)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """Returns a dynamic array of the key value pairs in the map."""
+        with self._lock:
+            return self._map.get_keys_and_values()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nconcurrent increments")
+    print("---------------------")
+    for map_class in (ConcurrentHashMap, LockedHashMap):
+        m = map_class(11, hash_function_2)
+
+        def work(thread: int) -> None:
+            for i in range(2000):
+                m.increment('key' + str(i % 100))
+                m.put('thread' + str(thread) + '-' + str(i), i)
+                m.remove('thread' + str(thread) + '-' + str(i - 10))
+
+        threads = [threading.Thread(target=work, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(map_class.__name__, m.get_size(), m.get('key0'), m.get('key99'), m.contains_key('thread0-1999'))
@@ -0,0 +1,114 @@
+# Name: Mason Hunerkoch
+# Description: Frequency counting, mode and top-k queries on top of the separate chaining and open addressing maps.
+
+import heapq
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+
+
+class CountingMap:
+    """
+    Counts how often each key occurs. The counts are kept in a separate chaining (hash_map_sc) or open addressing
+    (hash_map_oa) HashMap and bumped in place with the map's increment, so each occurrence costs one hash and one
+    probe sequence.
+    """
+
+    def __init__(self, capacity: int = 11, function: callable = hash_function_1, engine=hash_map_sc) -> None:
+        """Initialize an empty counting map on the HashMap of the engine module."""
+        self._map = engine.HashMap(capacity, function)
+
+    def add(self, key: str, delta: int = 1) -> int:
+        """Adds delta to the count of key and returns the new count."""
+        return self._map.increment(key, delta)
+
+    def update(self, iterable) -> None:
+        """Counts every key of an iterable, which may be a generator; it is consumed once and never stored."""
+        increment = self._map.increment
+        for key in iterable:
+            increment(key)
+
+    def count(self, key: str) -> int:
+        """Returns the count of key, 0 if it was never added."""
+        value = self._map.get(key)
+        return 0 if value is None else value
+
+    def get_size(self) -> int:
+        """Returns the number of distinct keys."""
+        return self._map.get_size()
+
+    def items(self):
+        """Returns a live view of the (key, count) pairs."""
+        return self._map.items()
+
+    def mode(self) -> tuple[DynamicArray, int]:
+        """Returns a dynamic array of the key(s) with the highest count, and that count."""
+        mode_keys = DynamicArray()
+        mode_count = 0
+        for key, count in self.items():
+            if count > mode_count:
+                mode_count = count
+                mode_keys = DynamicArray()
+                mode_keys.append(key)
+            elif count == mode_count:
+                mode_keys.append(key)
+        return mode_keys, mode_count
+
+    def most_common(self, k: int) -> DynamicArray:
+        """
+        Returns a dynamic array of the k (key, count) tuples with the highest counts, highest first.
+        Uses a heap of at most k tuples, so it takes O(n log k) time for n distinct keys.
+        """
+        return DynamicArray(heapq.nlargest(k, self.items(), key=lambda pair: pair[1]))
+
+
+def find_mode_stream(iterable, function: callable = hash_function_1, engine=hash_map_sc) -> tuple[DynamicArray, int]:
+    """
+    Same result as hash_map_sc.find_mode for any iterable or generator of keys, without building a DynamicArray
+    of the input first.
+    """
+    counter = CountingMap(11, function, engine)
+    counter.update(iterable)
+    return counter.mode()
+
+
+def find_top_k(da: DynamicArray, k: int, function: callable = hash_function_1) -> DynamicArray:
+    """Returns a dynamic array of the k most frequent values of da as (value, count) tuples, highest first."""
+    counter = CountingMap(max(da.length(), 11), function)
+    for index in range(da.length()):
+        counter.add(da[index])
+    return counter.most_common(k)
+
+
+def find_top_k_stream(iterable, k: int, function: callable = hash_function_1, engine=hash_map_sc) -> DynamicArray:
+    """find_top_k for any iterable or generator of keys."""
+    counter = CountingMap(11, function, engine)
+    counter.update(iterable)
+    return counter.most_common(k)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nCountingMap")
+    print("-----------")
+    for engine in (hash_map_sc, hash_map_oa):
+        counter = CountingMap(11, hash_function_2, engine)
+        counter.update(["Arch", "Manjaro", "Manjaro", "Mint", "Mint", "Mint", "Ubuntu", "Ubuntu", "Ubuntu"])
+        counter.add("Arch", 5)
+        print(engine.__name__, counter.get_size(), counter.count("Mint"), counter.count("Fedora"),
+              counter.mode()[0], counter.mode()[1])
+
+    print("\nfind_top_k")
+    print("----------")
+    da = DynamicArray(["2", "4", "2", "6", "8", "4", "1", "3", "4", "5", "7", "3", "3", "2"])
+    print(find_top_k(da, 3))
+
+    print("\nstreaming")
+    print("---------")
+    mode, frequency = find_mode_stream(str(i % 7) for i in range(100))
+    print(f"Mode : {mode}, Frequency: {frequency}")
+    print(find_top_k_stream((str(i * i % 10) for i in range(1000)), 2, hash_function_2, hash_map_oa))
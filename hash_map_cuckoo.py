@@ -0,0 +1,420 @@
+# Name: Mason Hunerkoch
+# Description: Cuckoo hash map: two tables, a small stash, and at most two slots looked at per lookup.
+#              Slots are placed by seeded variants of Python's hash(), never by the hash function passed to the
+#              map: that function is only cached per key to skip key comparisons, so keys it maps to one value
+#              (e.g. anagrams under hash_function_1) still spread over both tables.
+
+from array import array
+
+import hash_map_oa
+from a6_include import (ITER_ITEMS, ITER_KEYS, ITER_VALUES, DynamicArray, HashEntry, HashMapModifiedException,
+                        ItemsView, KeysView, ValuesView, hash_function_1, hash_function_2)
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Fibonacci hashing multiplier, used to mix the seed into Python's hash() of the key for table 0.
+_GOLDEN_64 = 0x9E3779B97F4A7C15
+
+# Python's own hash(), under another name because the methods here use hash as a variable like the other maps.
+_python_hash = hash
+
+# Two tables with one slot per bucket stop accepting keys near a load of 0.5, so the map grows before that.
+_MAX_LOAD = 0.45
+
+# Evictions an insert may make before the entry it holds goes to the stash.
+_MAX_KICKS = 64
+
+# Entries the stash holds before the table is rebuilt with new seeds.
+_STASH_SIZE = 4
+
+# Rebuilds with new seeds to try at one size before the tables are grown instead.
+_REHASH_ATTEMPTS = 4
+
+# What a HashMapIterator yields besides ITER_KEYS, ITER_VALUES and ITER_ITEMS.
+_ENTRIES = 3
+
+
+class HashMapIterator:
+    """
+    Iterator over the keys, values, (key, value) items or HashEntry copies of the entries of a HashMap: the
+    slots of both tables, then the stash. Raises HashMapModifiedException if a key is added or removed, or the
+    tables are rebuilt, while it runs.
+    """
+
+    __slots__ = ('_map', '_modifications', '_kind', '_index')
+
+    def __init__(self, hash_map: "HashMap", kind: int) -> None:
+        """Initialize the iterator at the first slot."""
+        self._map = hash_map
+        self._modifications = hash_map._modifications
+        self._kind = kind
+        self._index = 0
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next key, value, item or entry and advance the iterator."""
+        hash_map = self._map
+        if hash_map._modifications != self._modifications:
+            raise HashMapModifiedException("HashMap changed during iteration")
+
+        keys, capacity, index = hash_map._keys, hash_map._capacity, self._index
+        while index < capacity and keys[index] is None:
+            index += 1
+        if index >= capacity + len(hash_map._stash):
+            self._index = index
+            raise StopIteration
+        self._index = index + 1
+        entry = hash_map._entry(index)
+        if self._kind == ITER_KEYS:
+            return entry.key
+        if self._kind == ITER_VALUES:
+            return entry.value
+        if self._kind == ITER_ITEMS:
+            return entry.key, entry.value
+        return entry
+
+
+class HashMap:
+    """
+    Cuckoo hashing HashMap with the same interface as hash_map_oa.HashMap. Every key has exactly one slot in
+    each of two tables: in table 0 Python's hash() of the key, mixed with a seed, picks it; in table 1 hash()
+    of the key with another seed does (a seeded hash family like make_hash_function_seeded). A key is always
+    in one of its two slots or in a stash of at most 4 entries, so get, contains_key and remove look at two
+    slots and the stash, however full the map is and whatever the keys are. The map's hash function is only
+    cached per key to skip key comparisons, so keys that collide under it, e.g. anagrams under
+    hash_function_1, still spread over both tables.
+
+    put takes a free one of the two slots, or evicts the entry in table 0, which moves to its slot in the other
+    table and may evict another, up to 64 times. An entry still without a slot goes to the stash; once the stash
+    is full the tables are rebuilt with new seeds, and grown if a few seeds in a row fail. The tables grow
+    when the load factor would pass 0.45.
+
+    Keys, values and the map's hash of each key live in parallel arrays covering both tables: slots
+    0 .. table size - 1 are table 0 and the rest are table 1. Keys must not be None, which marks an empty slot.
+    """
+
+    __slots__ = ('_capacity', '_table_size', '_hash_function', '_size', '_modifications', '_seed', '_mixer',
+                 '_hashes', '_keys', '_values', '_stash')
+
+    # The prime helpers are shared with the open addressing map.
+    _next_prime = hash_map_oa.HashMap._next_prime
+    _is_prime = staticmethod(hash_map_oa.HashMap._is_prime)
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses
+        cuckoo hashing for collision resolution
+        """
+        self._hash_function = function
+        self._size = 0
+        self._modifications = 0
+        self._seed = 0
+        self._mixer = 0
+        self._allocate(self._next_prime((capacity + 1) // 2))
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity + len(self._stash)):
+            name = str(i) if i < self._capacity else 'stash ' + str(i - self._capacity)
+            out += name + ': ' + str(self._entry(i)) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map: the slots of both tables
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def from_items(cls, iterable, function, expected_size: int = None) -> "HashMap":
+        """
+        Builds a new map from an iterable of (key, value) pairs. The capacity is sized once from the number of
+        pairs (or expected_size if larger) so no resize happens during the load.
+        """
+        pairs = list(iterable)
+        if expected_size is None or expected_size < len(pairs):
+            expected_size = len(pairs)
+
+        new_map = cls(max(int(expected_size / _MAX_LOAD) + 1, 11), function)
+        for key, value in pairs:
+            new_map.put(key, value)
+        return new_map
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
+        The tables grow first if the new key would take the load factor past 0.45.
+        """
+        hash = self._hash_function(key) & _MASK_64
+        index = self._find(key, hash)
+        if index >= 0:
+            self._values[index] = value
+            return
+        for entry in self._stash:
+            if entry.key == key:
+                entry.value = value
+                return
+
+        if self._size + 1 > self._capacity * _MAX_LOAD:
+            self.resize_table(self._capacity * 2)
+        self._size += 1
+        self._modifications += 1
+        homeless = self._insert(key, value, hash)
+        if homeless is not None:
+            self._rebuild(self._table_size, homeless, True)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the tables if the size passed is at least the number of entries. Each table gets the next prime
+        of half the capacity, doubled until the load factor is at most 0.45.
+        """
+        if new_capacity < self._size:
+            return
+        table_size = self._next_prime((new_capacity + 1) // 2)
+        while self._size > 2 * table_size * _MAX_LOAD:
+            table_size = self._next_prime(table_size * 2)
+        self._rebuild(table_size)
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor the map.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty slots in the two tables.
+        """
+        return self._capacity - self._size + len(self._stash)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the key or None if the key is not in the map.
+        """
+        index = self._find(key, self._hash_function(key) & _MASK_64)
+        if index >= 0:
+            return self._values[index]
+        for entry in self._stash:
+            if entry.key == key:
+                return entry.value
+        return None
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True or False based on whether or not the key is in the map.
+        """
+        if self._find(key, self._hash_function(key) & _MASK_64) >= 0:
+            return True
+        for entry in self._stash:
+            if entry.key == key:
+                return True
+        return False
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a key from the map. No tombstone is needed: a key is only ever looked for in its own two slots.
+        A freed slot may let a stashed entry move back into the tables.
+        """
+        index = self._find(key, self._hash_function(key) & _MASK_64)
+        if index >= 0:
+            self._keys[index] = None
+            self._values[index] = None
+            self._size -= 1
+            self._modifications += 1
+            if self._stash:
+                self._drain_stash()
+            return
+        for position in range(len(self._stash)):
+            if self._stash[position].key == key:
+                del self._stash[position]
+                self._size -= 1
+                self._modifications += 1
+                return
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
+        """
+        our_array = DynamicArray()
+        for index in range(self._capacity):
+            if self._keys[index] is not None:
+                our_array.append((self._keys[index], self._values[index]))
+        for entry in self._stash:
+            our_array.append((entry.key, entry.value))
+        return our_array
+
+    def clear(self) -> None:
+        """
+        Clears the hash map.
+        """
+        self._allocate(self._table_size)
+        self._size = 0
+
+    def keys(self) -> KeysView:
+        """Returns a live view of the keys of the map."""
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """Returns a live view of the values of the map."""
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """Returns a live view of the (key, value) pairs of the map."""
+        return ItemsView(self)
+
+    def _iterator(self, kind: int) -> HashMapIterator:
+        """Returns a new iterator over the map, see HashMapIterator."""
+        return HashMapIterator(self, kind)
+
+    def __iter__(self) -> HashMapIterator:
+        """
+        Iterator for loop. Yields each entry as a HashEntry; each loop gets its own iterator.
+        """
+        return HashMapIterator(self, _ENTRIES)
+
+    # ------------------------------------------------------------------ #
+
+    def _find(self, key: str, hash: int) -> int:
+        """Returns the slot holding key in either table, or -1 if it is not in the tables."""
+        hashes, keys, table_size = self._hashes, self._keys, self._table_size
+        index = (((_python_hash(key) ^ self._mixer) * _GOLDEN_64) & _MASK_64) % table_size
+        if hashes[index] == hash and keys[index] == key:
+            return index
+        index = table_size + (_python_hash((self._seed, key)) & _MASK_64) % table_size
+        if hashes[index] == hash and keys[index] == key:
+            return index
+        return -1
+
+    def _insert(self, key: str, value: object, hash: int) -> HashEntry:
+        """
+        Places a key that is not in the map: in a free one of its two slots, otherwise by evicting entries
+        between the tables, otherwise in the stash. Returns None, or the entry left without a place if the
+        stash is full.
+        """
+        hashes, keys, values, table_size = self._hashes, self._keys, self._values, self._table_size
+        index = (((_python_hash(key) ^ self._mixer) * _GOLDEN_64) & _MASK_64) % table_size
+        if keys[index] is not None:
+            other = table_size + (_python_hash((self._seed, key)) & _MASK_64) % table_size
+            if keys[other] is None:
+                index = other
+            else:
+                for _ in range(_MAX_KICKS):
+                    # Take the slot and carry on with the entry that was in it, to its slot in the other table.
+                    key, keys[index] = keys[index], key
+                    value, values[index] = values[index], value
+                    hash, hashes[index] = hashes[index], hash
+                    if index < table_size:
+                        index = table_size + (_python_hash((self._seed, key)) & _MASK_64) % table_size
+                    else:
+                        index = (((_python_hash(key) ^ self._mixer) * _GOLDEN_64) & _MASK_64) % table_size
+                    if keys[index] is None:
+                        break
+                else:
+                    if len(self._stash) < _STASH_SIZE:
+                        self._stash.append(HashEntry(key, value, hash))
+                        return None
+                    return HashEntry(key, value, hash)
+
+        keys[index] = key
+        values[index] = value
+        hashes[index] = hash
+        return None
+
+    def _drain_stash(self) -> None:
+        """Moves stashed entries whose slot in either table is free back into the tables."""
+        keys, table_size = self._keys, self._table_size
+        for entry in list(self._stash):
+            index = (((_python_hash(entry.key) ^ self._mixer) * _GOLDEN_64) & _MASK_64) % table_size
+            if keys[index] is not None:
+                index = table_size + (_python_hash((self._seed, entry.key)) & _MASK_64) % table_size
+            if keys[index] is None:
+                keys[index] = entry.key
+                self._values[index] = entry.value
+                self._hashes[index] = entry.hash
+                self._stash.remove(entry)
+
+    def _rebuild(self, table_size: int, extra: HashEntry = None, reseed: bool = False) -> None:
+        """
+        Places every entry, and extra if given, into new tables of table_size slots each, using the cached
+        hashes. If reseed is set, or an attempt leaves an entry without a place, new seeds are drawn; after
+        a few failed seeds in a row the tables are grown.
+        """
+        entries = [self._entry(index) for index in range(self._capacity + len(self._stash))]
+        entries = [entry for entry in entries if entry is not None]
+        if extra is not None:
+            entries.append(extra)
+
+        attempts = 0
+        while True:
+            if reseed:
+                self._seed += 1
+                self._mixer = (self._seed * _GOLDEN_64) & _MASK_64
+            self._allocate(table_size)
+            if all(self._insert(entry.key, entry.value, entry.hash) is None for entry in entries):
+                return
+            reseed = True
+            attempts += 1
+            if attempts % _REHASH_ATTEMPTS == 0:
+                table_size = self._next_prime(table_size * 2)
+
+    def _allocate(self, table_size: int) -> None:
+        """Creates two empty tables of table_size slots each and an empty stash."""
+        self._table_size = table_size
+        self._capacity = 2 * table_size
+        self._modifications += 1
+        self._hashes = array('Q', [0]) * self._capacity
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._stash = []
+
+    def _entry(self, index: int) -> HashEntry:
+        """Returns the entry at a slot index, or at stash position index - capacity, or None if it is empty."""
+        if index >= self._capacity:
+            entry = self._stash[index - self._capacity]
+            return HashEntry(entry.key, entry.value, entry.hash)
+        if self._keys[index] is None:
+            return None
+        return HashEntry(self._keys[index], self._values[index], self._hashes[index])
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nput, get and remove")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    m.remove('str0')
+    print(m.get('str0'), m.get('str1'), m.contains_key('str0'), m.contains_key('str149'))
+
+    print("\nget_keys_and_values")
+    print("-------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    m.remove('1')
+    m.resize_table(12)
+    # Table 1 uses Python's hash(), which changes between runs, so the slot order is sorted out.
+    pairs = m.get_keys_and_values()
+    print(sorted(pairs[index] for index in range(pairs.length())))
+    for item in sorted(m, key=lambda entry: entry.key):
+        print('K:', item.key, 'V:', item.value)
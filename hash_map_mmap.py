@@ -0,0 +1,531 @@
+# Name: Mason Hunerkoch
+# Description: Open addressing hash map whose slots and key/value data live in memory-mapped files.
+
+import mmap
+import os
+import pickle
+import struct
+
+from hash_map_oa import ProbeLimitException
+from a6_include import (ITER_KEYS, ITER_VALUES, DynamicArray, HashMapModifiedException, ItemsView, KeysView,
+                        ValuesView, hash_function_1, hash_function_2, is_prime, next_prime)
+
+# Slot file: a header followed by capacity fixed-width slots. Heap file: length-prefixed key and value records.
+_MAGIC = b'HMAPMM01'
+_HEADER = struct.Struct('<8sQQQQ')      # magic, capacity, size, tombstones, end of the used part of the heap
+_SLOT = struct.Struct('<QQQB7x')        # key hash, key offset, value offset, state
+_STATE = 24                             # offset of the state byte within a slot
+_LENGTH = struct.Struct('<I')
+
+# Slot states. A zero-filled slot is empty.
+_EMPTY = 0
+_OCCUPIED = 1
+_TOMBSTONE = 2
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+_MIN_HEAP_SIZE = 1 << 16
+
+
+class ReadOnlyMapException(Exception):
+    """Raised when a map opened read-only is asked to change."""
+    pass
+
+
+class HashMapIterator:
+    """
+    Iterator over the keys, values or (key, value) items of the occupied slots of a HashMap.
+    Raises HashMapModifiedException if a key is added or removed, or the table is rebuilt, while it runs.
+    """
+
+    def __init__(self, hash_map: "HashMap", kind: int) -> None:
+        """Initialize the iterator at the first slot."""
+        self._map = hash_map
+        self._modifications = hash_map._modifications
+        self._kind = kind
+        self._index = 0
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next key, value or item and advance the iterator."""
+        hash_map = self._map
+        if hash_map._modifications != self._modifications:
+            raise HashMapModifiedException("HashMap changed during iteration")
+
+        while self._index < hash_map._capacity:
+            index = self._index
+            self._index += 1
+            _, key_offset, value_offset, state = hash_map._slot(index)
+            if state == _OCCUPIED:
+                if self._kind == ITER_KEYS:
+                    return hash_map._read_key(key_offset)
+                if self._kind == ITER_VALUES:
+                    return hash_map._read_value(value_offset)
+                return hash_map._read_key(key_offset), hash_map._read_value(value_offset)
+        raise StopIteration
+
+
+class HashMap:
+    """
+    Open addressing HashMap with quadratic probing and a prime capacity, like hash_map_oa.HashMap, stored in two
+    memory-mapped files so opening a map does not read it into memory:
+
+    path        a header and the slot array; each slot holds the 64-bit key hash, the offsets of the key and the
+                value in the heap file, and the empty/occupied/tombstone state
+    path.heap   an append-only heap of length-prefixed records: UTF-8 keys and pickled values
+
+    A put appends the new value (and the key, for a new key) to the heap and then points the slot at it; old
+    records are never rewritten. resize_table and compact write a complete new slot file next to the old one and
+    swap it in with os.replace, so a crash leaves either the old table or the new one, never a mix. The heap is
+    not touched by a resize.
+
+    Opening with readonly=True maps the files read-only, so several processes can share one map. Read-only maps
+    are meant for files no process is writing to. Keys must be str, values anything pickle can store, and the
+    map must be opened with the hash function it was written with.
+    """
+
+    # The same prime search as the separate chaining and open addressing maps.
+    _next_prime = staticmethod(next_prime)
+    _is_prime = staticmethod(is_prime)
+
+    def __init__(self, path: str, function: callable = hash_function_1, capacity: int = 11,
+                 readonly: bool = False) -> None:
+        """
+        Opens the map stored at path, or creates an empty one of the given capacity if there is none.
+        """
+        self._path = path
+        self._heap_path = path + '.heap'
+        self._hash_function = function
+        self._readonly = readonly
+        self._max_tombstone_ratio = 0.25
+        self._modifications = 0
+        self._slot_file = self._heap_file = self._slots = self._heap = None
+
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            if not os.path.exists(self._heap_path):
+                with open(self._heap_path, 'wb') as file:
+                    file.truncate(_MIN_HEAP_SIZE)
+            self._write_slot_file(path, self._next_prime(capacity), 0, 0, 0, ())
+        self._open()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for index in range(self._capacity):
+            _, key_offset, value_offset, state = self._slot(index)
+            if state == _EMPTY:
+                entry = None
+            elif state == _TOMBSTONE:
+                entry = 'K: ' + str(self._read_key(key_offset)) + ' TS: True'
+            else:
+                entry = 'K: ' + str(self._read_key(key_offset)) + ' V: ' + str(self._read_value(value_offset))
+            out += str(index) + ': ' + str(entry) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        First this method will check if the load factor is 0.5 or greater and resize if so.
+        Next, adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
+        """
+        self._check_writable()
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+        elif (self._size + self._tombstones) / self._capacity >= 0.5:
+            # Mostly tombstones: rehash at the same size so at most half the slots stay in use.
+            self.compact()
+
+        hash = self._hash_function(key) & _MASK_64
+        encoded = key.encode()
+        try:
+            index = self._insert_index(hash, encoded)
+        except ProbeLimitException:
+            # No free slot on this key's probe path: drop the tombstones, or grow if there are none, and retry.
+            if self._tombstones:
+                self.compact()
+            else:
+                self.resize_table(self._capacity * 2)
+            self.put(key, value)
+            return
+        _, key_offset, _, state = self._slot(index)
+
+        # Heap records first, then the header that covers them, then the slot that points at them.
+        value_offset = self._append(pickle.dumps(value))
+        if state != _OCCUPIED:
+            key_offset = self._append(encoded)
+        self._write_header()
+        self._set_slot(index, hash, key_offset, value_offset, _OCCUPIED)
+
+        if state != _OCCUPIED:
+            if state == _TOMBSTONE:
+                self._tombstones -= 1
+            self._size += 1
+            self._modifications += 1
+            self._write_header()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the table if the size passed is at least the number of entries. The function will verify the size
+        is a prime number and if not, resize the table to the next prime number.
+        The new slot array is written to a separate file and swapped in atomically.
+        """
+        self._check_writable()
+        if new_capacity < self._size:
+            return
+        if not self._is_prime(new_capacity):
+            new_capacity = self._next_prime(new_capacity)
+
+        # Grow the same way re-putting every pair would, so the load stays below 0.5.
+        while (self._size - 1) / new_capacity >= 0.5:
+            new_capacity = self._next_prime(new_capacity * 2)
+
+        # If a probe path fills up the capacity is doubled and the new file is written again.
+        while True:
+            occupied = (slot for slot in map(self._slot, range(self._capacity)) if slot[3] == _OCCUPIED)
+            try:
+                self._replace_slot_file(new_capacity, self._size, self._heap_end, occupied)
+                return
+            except ProbeLimitException:
+                new_capacity = self._next_prime(new_capacity * 2)
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor the map.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets within the map. Tombstones are not empty, since probes still walk
+        through them.
+        """
+        return self._capacity - self._size - self._tombstones
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the key or None if the key is not in the map.
+        """
+        index = self._find(key)
+        if index < 0:
+            return None
+        return self._read_value(self._slot(index)[2])
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True or False based on whether or not the key is in the map.
+        """
+        return self._find(key) >= 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a key from the map.
+        """
+        self._check_writable()
+        index = self._find(key)
+        if index >= 0:
+            hash, key_offset, value_offset, _ = self._slot(index)
+            self._set_slot(index, hash, key_offset, value_offset, _TOMBSTONE)
+            self._size -= 1
+            self._tombstones += 1
+            self._modifications += 1
+            self._write_header()
+            if self._tombstones / self._capacity >= self._max_tombstone_ratio:
+                self.compact()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
+        """
+        our_array = DynamicArray()
+        for item in self.items():
+            our_array.append(item)
+        return our_array
+
+    def clear(self) -> None:
+        """
+        Clears the hash map. The heap is emptied as well.
+        """
+        self._check_writable()
+        self._replace_slot_file(self._capacity, 0, 0, ())
+
+    def keys(self) -> KeysView:
+        """Returns a live view of the keys of the map."""
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """Returns a live view of the values of the map."""
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """Returns a live view of the (key, value) pairs of the map."""
+        return ItemsView(self)
+
+    def _iterator(self, kind: int) -> HashMapIterator:
+        """Returns a new iterator over the map, see HashMapIterator."""
+        return HashMapIterator(self, kind)
+
+    def __iter__(self) -> HashMapIterator:
+        """Iterates over the keys of the map."""
+        return HashMapIterator(self, ITER_KEYS)
+
+    def compact(self) -> None:
+        """Rewrites the slot array at the same capacity, which drops every tombstone."""
+        self.resize_table(self._capacity)
+
+    def set_max_tombstone_ratio(self, ratio: float) -> None:
+        """Sets the share of slots tombstones may fill before remove compacts the table."""
+        self._max_tombstone_ratio = ratio
+
+    def flush(self) -> None:
+        """Writes changed pages of both files back to disk."""
+        if not self._readonly:
+            self._heap.flush()
+            self._slots.flush()
+
+    def close(self) -> None:
+        """Flushes and unmaps the files. The map cannot be used afterwards."""
+        if self._slots is not None:
+            self.flush()
+            self._close_files()
+
+    def _close_files(self) -> None:
+        """Unmaps and closes both files without flushing them."""
+        for resource in (self._slots, self._heap, self._slot_file, self._heap_file):
+            resource.close()
+        self._slot_file = self._heap_file = self._slots = self._heap = None
+
+    def __enter__(self) -> "HashMap":
+        """Lets the map be used in a with statement, which closes it at the end."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Closes the map at the end of a with statement."""
+        self.close()
+
+    # ------------------- slot and heap access ---------------------------- #
+
+    def _open(self) -> None:
+        """Maps both files and reads the header."""
+        mode, access = ('rb', mmap.ACCESS_READ) if self._readonly else ('r+b', mmap.ACCESS_WRITE)
+        self._slot_file = open(self._path, mode)
+        self._heap_file = open(self._heap_path, mode)
+        if os.fstat(self._slot_file.fileno()).st_size < _HEADER.size or \
+                os.fstat(self._heap_file.fileno()).st_size == 0:
+            self._slot_file.close()
+            self._heap_file.close()
+            self._slot_file = self._heap_file = None
+            raise ValueError(self._path + " is not a memory-mapped hash map file")
+        self._slots = mmap.mmap(self._slot_file.fileno(), 0, access=access)
+        self._heap = mmap.mmap(self._heap_file.fileno(), 0, access=access)
+
+        # Check the magic before trusting the header, and that the file is as long as the header says.
+        if self._slots[:len(_MAGIC)] != _MAGIC:
+            self._close_files()
+            raise ValueError(self._path + " is not a memory-mapped hash map file")
+        _, self._capacity, self._size, self._tombstones, self._heap_end = _HEADER.unpack_from(self._slots, 0)
+        if len(self._slots) < _HEADER.size + self._capacity * _SLOT.size or self._heap_end > len(self._heap):
+            self._close_files()
+            raise ValueError(self._path + " is truncated or damaged")
+
+    def _check_writable(self) -> None:
+        """Raises ReadOnlyMapException if the map was opened read-only."""
+        if self._readonly:
+            raise ReadOnlyMapException(self._path + " is open read-only")
+
+    def _write_header(self) -> None:
+        """Stores the capacity, size, tombstone count and heap end in the slot file header."""
+        _HEADER.pack_into(self._slots, 0, _MAGIC, self._capacity, self._size, self._tombstones, self._heap_end)
+
+    def _slot(self, index: int) -> tuple[int, int, int, int]:
+        """Returns the (hash, key offset, value offset, state) of the slot at index."""
+        return _SLOT.unpack_from(self._slots, _HEADER.size + index * _SLOT.size)
+
+    def _set_slot(self, index: int, hash: int, key_offset: int, value_offset: int, state: int) -> None:
+        """Stores a slot at index."""
+        _SLOT.pack_into(self._slots, _HEADER.size + index * _SLOT.size, hash, key_offset, value_offset, state)
+
+    def _read(self, offset: int) -> bytes:
+        """Returns the heap record at offset."""
+        length = _LENGTH.unpack_from(self._heap, offset)[0]
+        start = offset + _LENGTH.size
+        return self._heap[start:start + length]
+
+    def _read_key(self, offset: int) -> str:
+        """Returns the key stored at offset in the heap."""
+        return self._read(offset).decode()
+
+    def _read_value(self, offset: int) -> object:
+        """Returns the value stored at offset in the heap."""
+        return pickle.loads(self._read(offset))
+
+    def _append(self, data: bytes) -> int:
+        """Appends a record to the heap, growing the heap file if needed, and returns its offset."""
+        offset = self._heap_end
+        end = offset + _LENGTH.size + len(data)
+        if end > len(self._heap):
+            # Double the file so appends stay amortized constant time, then map it again.
+            self._heap.close()
+            self._heap_file.truncate(max(2 * end, _MIN_HEAP_SIZE))
+            self._heap = mmap.mmap(self._heap_file.fileno(), 0, access=mmap.ACCESS_WRITE)
+        _LENGTH.pack_into(self._heap, offset, len(data))
+        self._heap[offset + _LENGTH.size:end] = data
+        self._heap_end = end
+        return offset
+
+    def _find(self, key: str) -> int:
+        """Returns the index of the occupied slot holding key, or -1 if the key is not in the map."""
+        hash = self._hash_function(key) & _MASK_64
+        encoded = key.encode()
+        capacity = self._capacity
+        # With a prime capacity the first capacity // 2 + 1 probes are distinct, then they repeat.
+        limit = capacity // 2 + 1
+        home = index = hash % capacity
+        counter = 0
+        while True:
+            slot_hash, key_offset, _, state = self._slot(index)
+            if state == _EMPTY:
+                return -1
+            if state == _OCCUPIED and slot_hash == hash and self._read(key_offset) == encoded:
+                return index
+            counter += 1
+            if counter == limit:
+                return -1
+            index = (home + counter * counter) % capacity
+
+    def _insert_index(self, hash: int, encoded: bytes) -> int:
+        """
+        Finds where to put a key via quadratic probing: the slot holding the key if there is one, otherwise the
+        first tombstone passed on the way, otherwise the first empty slot.
+        Raises ProbeLimitException if the probes start repeating before any of those turns up.
+        """
+        capacity = self._capacity
+        limit = capacity // 2 + 1
+        home = index = hash % capacity
+        counter = 0
+        first_tombstone = None
+        while True:
+            slot_hash, key_offset, _, state = self._slot(index)
+            if state == _EMPTY:
+                return index if first_tombstone is None else first_tombstone
+            if state == _TOMBSTONE:
+                if first_tombstone is None:
+                    first_tombstone = index
+            elif slot_hash == hash and self._read(key_offset) == encoded:
+                return index
+            counter += 1
+            if counter == limit:
+                if first_tombstone is None:
+                    raise ProbeLimitException
+                return first_tombstone
+            index = (home + counter * counter) % capacity
+
+    # ------------------- crash-safe slot file replacement ---------------- #
+
+    def _replace_slot_file(self, capacity: int, size: int, heap_end: int, slots) -> None:
+        """
+        Writes a new slot file holding the given (hash, key offset, value offset, state) slots and swaps it in for
+        the current one. The new file is complete and synced before os.replace, so a crash at any point leaves a
+        valid table on disk.
+        """
+        temporary = self._path + '.resize'
+        self._write_slot_file(temporary, capacity, size, 0, heap_end, slots)
+        self._slots.close()
+        self._slot_file.close()
+        self._heap.close()
+        self._heap_file.close()
+        os.replace(temporary, self._path)
+        _fsync_directory(self._path)
+        self._modifications += 1
+        self._open()
+
+    def _write_slot_file(self, path: str, capacity: int, size: int, tombstones: int, heap_end: int,
+                         slots) -> None:
+        """
+        Writes a slot file of the given capacity and places the slots in it by quadratic probing.
+        Raises ProbeLimitException if a slot finds no free place on its probe path.
+        """
+        length = _HEADER.size + capacity * _SLOT.size
+        with open(path, 'w+b') as file:
+            file.truncate(length)
+            with mmap.mmap(file.fileno(), length, access=mmap.ACCESS_WRITE) as new_slots:
+                _HEADER.pack_into(new_slots, 0, _MAGIC, capacity, size, tombstones, heap_end)
+                for hash, key_offset, value_offset, state in slots:
+                    home = index = hash % capacity
+                    counter = 0
+                    while new_slots[_HEADER.size + index * _SLOT.size + _STATE] != _EMPTY:
+                        counter += 1
+                        if counter > capacity // 2:
+                            raise ProbeLimitException
+                        index = (home + counter * counter) % capacity
+                    _SLOT.pack_into(new_slots, _HEADER.size + index * _SLOT.size,
+                                    hash, key_offset, value_offset, _OCCUPIED)
+                new_slots.flush()
+            os.fsync(file.fileno())
+
+
+def _fsync_directory(path: str) -> None:
+    """Syncs the directory holding path so a rename in it survives a crash. A no-op where it is unsupported."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'example.map')
+
+    print("\nput, get and remove")
+    print("-------------------")
+    with HashMap(path, hash_function_1, 53) as m:
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+            if i % 25 == 24:
+                print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+        m.remove('str0')
+        print(m.get('str0'), m.get('str1'), m.contains_key('str0'), m.contains_key('str149'))
+
+    print("\nreopen read-only")
+    print("----------------")
+    with HashMap(path, hash_function_1, readonly=True) as m:
+        print(m.get_size(), m.get_capacity(), m.get('str1'), m.get('str149'))
+        try:
+            m.put('str0', 0)
+        except ReadOnlyMapException as exception:
+            print('ReadOnlyMapException:', exception)
+
+    print("\nget_keys_and_values")
+    print("-------------------")
+    with HashMap(os.path.join(directory, 'small.map'), hash_function_2) as m:
+        for i in range(1, 6):
+            m.put(str(i), str(i * 10))
+        m.remove('1')
+        m.resize_table(12)
+        print(m.get_keys_and_values())
@@ -1,11 +1,300 @@
 # Name: Mason Hunerkoch
 # Description: Implement a hash map via chaining and open addressing.
 
-from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
-                        hash_function_1, hash_function_2)
+from array import array
+
+import hash_batch
+from a6_include import (ITER_ITEMS, ITER_KEYS, ITER_VALUES, DynamicArray, DynamicArrayException, HashEntry,
+                        HashMapModifiedException, ItemsView, KeysView, ValuesView, hash_function_1, hash_function_2,
+                        read_snapshot, write_snapshot)
+
+
+# Placeholder left in the old table for a slot whose entry has been moved during an incremental resize.
+_MIGRATED = HashEntry(None, None)
+_MIGRATED.is_tombstone = True
+
+
+class ProbeLimitException(Exception):
+    """Raised when a put finds no free slot within the probe limit of its key."""
+    pass
+
+
+# What a HashMapIterator yields besides ITER_KEYS, ITER_VALUES and ITER_ITEMS.
+_ENTRIES = 3
+
+
+class HashMapIterator:
+    """
+    Iterator over the keys, values, (key, value) items or HashEntry objects of an open addressing HashMap.
+    It walks the slots in place, skipping empty slots and tombstones, and keeps its position on the iterator, so
+    any number of iterators can run at once.
+    Raises HashMapModifiedException if a key is added or removed, or the table is resized, while it runs.
+    """
+
+    def __init__(self, hash_map: "HashMap", kind: int) -> None:
+        """Initialize the iterator at the first slot. An incremental resize in progress is finished first."""
+        hash_map._finish_migration()
+        self._map = hash_map
+        self._modifications = hash_map._modifications
+        self._kind = kind
+        self._index = 0
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next key, value, item or entry and advance the iterator."""
+        hash_map = self._map
+        if hash_map._modifications != self._modifications:
+            raise HashMapModifiedException("HashMap changed during iteration")
+
+        buckets, capacity, index = hash_map._buckets._data, hash_map._capacity, self._index
+        while index < capacity:
+            entry = buckets[index]
+            index += 1
+            if entry is not None and entry.is_tombstone is False:
+                self._index = index
+                if self._kind == ITER_KEYS:
+                    return entry.key
+                if self._kind == ITER_VALUES:
+                    return entry.value
+                if self._kind == ITER_ITEMS:
+                    return entry.key, entry.value
+                return entry
+        self._index = index
+        raise StopIteration
+
+
+class ProbingStrategy:
+    """
+    Collision resolution for the open addressing HashMap. A strategy finds, places and deletes entries in a bucket
+    array. This base class walks a probe sequence from the home index and leaves tombstones on delete; subclasses
+    define the sequence in _next_index. Strategies keep no state of their own, so one can be shared by many maps.
+    find and put also return how many slots they looked at, which the map uses for its probe counters.
+    buckets is a DynamicArray or, on the map's hot paths, the list behind one; only indexing is used.
+    """
+
+    def _step(self, key: str, capacity: int) -> int:
+        """Returns the per-key step used by _next_index. Only double hashing needs one."""
+        return 1
+
+    def _next_index(self, home: int, counter: int, step: int, capacity: int) -> int:
+        """Returns the index of probe number counter, counting the home index as probe 0."""
+        raise NotImplementedError
+
+    def max_probes(self, capacity: int) -> int:
+        """Returns how many slots a probe may look at before giving up. The sequence repeats after that many."""
+        return capacity
+
+    def find(self, buckets: DynamicArray, capacity: int, key: str, hash: int) -> tuple[int, int]:
+        """
+        Returns the index of the live entry for key, or -1 if key is not in the table,
+        and the number of slots looked at.
+        """
+        home = index = hash % capacity
+        step = self._step(key, capacity)
+        limit = self.max_probes(capacity)
+        counter = 0
+        while buckets[index] is not None:
+            entry = buckets[index]
+            if entry.hash == hash and entry.key == key and entry.is_tombstone is False:
+                return index, counter + 1
+            counter += 1
+            if counter == limit:
+                return -1, counter
+            index = self._next_index(home, counter, step, capacity)
+        return -1, counter + 1
+
+    def put(self, buckets: DynamicArray, capacity: int, new_entry: HashEntry) -> tuple[HashEntry, int]:
+        """
+        Stores new_entry in place of the live entry with the same key, otherwise at the first tombstone passed,
+        otherwise at the first empty index. Returns the entry that was replaced (the old live entry, a tombstone,
+        or None) and the number of slots looked at.
+        Raises ProbeLimitException if there is nowhere to store it within the probe limit.
+        """
+        home = index = new_entry.hash % capacity
+        step = self._step(new_entry.key, capacity)
+        limit = self.max_probes(capacity)
+        counter = 0
+        first_tombstone = None
+        while buckets[index] is not None:
+            entry = buckets[index]
+            if entry.is_tombstone is True:
+                if first_tombstone is None:
+                    first_tombstone = index
+            elif entry.hash == new_entry.hash and entry.key == new_entry.key:
+                break
+            counter += 1
+            if counter == limit:
+                if first_tombstone is None:
+                    raise ProbeLimitException
+                index = first_tombstone
+                break
+            index = self._next_index(home, counter, step, capacity)
+        else:
+            if first_tombstone is not None:
+                index = first_tombstone
+
+        previous = buckets[index]
+        buckets[index] = new_entry
+        return previous, counter + 1
+
+    def delete(self, buckets: DynamicArray, capacity: int, index: int) -> bool:
+        """Removes the live entry at index. Returns True if a tombstone was left behind."""
+        buckets[index].is_tombstone = True
+        return True
+
+    def probe_length(self, buckets: DynamicArray, capacity: int, index: int) -> int:
+        """Returns how many slots a lookup of the entry at index looks at, including its own."""
+        entry = buckets[index]
+        home = probe = entry.hash % capacity
+        step = self._step(entry.key, capacity)
+        counter = 0
+        while probe != index:
+            counter += 1
+            probe = self._next_index(home, counter, step, capacity)
+        return counter + 1
+
+
+class LinearProbing(ProbingStrategy):
+    """Probes home, home + 1, home + 2, ... which keeps a probe within neighbouring slots."""
+
+    def _next_index(self, home: int, counter: int, step: int, capacity: int) -> int:
+        return (home + counter) % capacity
+
+
+class QuadraticProbing(ProbingStrategy):
+    """Probes home, home + 1, home + 4, home + 9, ... the same sequence as HashMap.quadratic_prob."""
+
+    def _next_index(self, home: int, counter: int, step: int, capacity: int) -> int:
+        return (home + counter * counter) % capacity
+
+    def max_probes(self, capacity: int) -> int:
+        # With a prime capacity the first (capacity + 1) / 2 probes are distinct, then they repeat.
+        return capacity // 2 + 1
+
+
+class DoubleHashing(ProbingStrategy):
+    """
+    Probes home, home + s, home + 2s, ... where the step s comes from a second hash function of the key.
+    With a prime capacity every slot is reached.
+    """
+
+    def __init__(self, function: callable = hash_function_2) -> None:
+        self._function = function
+
+    def _step(self, key: str, capacity: int) -> int:
+        return 1 + self._function(key) % (capacity - 1) if capacity > 2 else 1
+
+    def _next_index(self, home: int, counter: int, step: int, capacity: int) -> int:
+        return (home + counter * step) % capacity
+
+
+class RobinHoodHashing(ProbingStrategy):
+    """
+    Linear probing where an entry being placed takes the slot of any entry that is closer to its own home,
+    so probe lengths stay even across the table. A lookup can stop as soon as it passes an entry closer to home
+    than the current probe. Deletes shift the following entries back instead of leaving tombstones.
+    Tombstones only appear in the old table of an incremental resize, and lookups step over them.
+    """
+
+    def _next_index(self, home: int, counter: int, step: int, capacity: int) -> int:
+        return (home + counter) % capacity
+
+    @staticmethod
+    def _distance(entry: HashEntry, index: int, capacity: int) -> int:
+        """Returns how far index is from the home index of entry."""
+        return (index - entry.hash % capacity) % capacity
+
+    def find(self, buckets: DynamicArray, capacity: int, key: str, hash: int) -> tuple[int, int]:
+        index = hash % capacity
+        distance = 0
+        while buckets[index] is not None and distance < capacity:
+            entry = buckets[index]
+            if entry.is_tombstone is False:
+                if entry.hash == hash and entry.key == key:
+                    return index, distance + 1
+                if self._distance(entry, index, capacity) < distance:
+                    # key would have taken this slot, so it is not in the table.
+                    return -1, distance + 1
+            index = (index + 1) % capacity
+            distance += 1
+        return -1, distance + 1
+
+    def put(self, buckets: DynamicArray, capacity: int, new_entry: HashEntry) -> tuple[HashEntry, int]:
+        index, probes = self.find(buckets, capacity, new_entry.key, new_entry.hash)
+        if index >= 0:
+            previous = buckets[index]
+            buckets[index] = new_entry
+            return previous, probes
+
+        # Walk from home, swapping the entry being placed with any entry that is closer to its home.
+        placing = new_entry
+        index = placing.hash % capacity
+        distance = counter = 0
+        while buckets[index] is not None:
+            entry = buckets[index]
+            if entry.is_tombstone is False:
+                entry_distance = self._distance(entry, index, capacity)
+                if entry_distance < distance:
+                    buckets[index], placing = placing, entry
+                    distance = entry_distance
+            index = (index + 1) % capacity
+            distance += 1
+            counter += 1
+            if counter == capacity:
+                # Only reachable when the table has no empty slot at all.
+                raise ProbeLimitException
+        buckets[index] = placing
+        return None, counter + 1
+
+    def delete(self, buckets: DynamicArray, capacity: int, index: int) -> bool:
+        # Shift back every following entry that is not already at its home.
+        following = (index + 1) % capacity
+        while buckets[following] is not None and buckets[following].is_tombstone is False \
+                and self._distance(buckets[following], following, capacity) > 0:
+            buckets[index] = buckets[following]
+            index, following = following, (following + 1) % capacity
+        buckets[index] = None
+        return False
+
+
+# Probing strategies by the id a snapshot stores for them.
+_SNAPSHOT_PROBING = (QuadraticProbing, LinearProbing, DoubleHashing, RobinHoodHashing)
+_SNAPSHOT_MAGIC = b'HMAPOA02'
+
+# Snapshot state byte of a slot.
+_SNAPSHOT_LIVE = 1
+_SNAPSHOT_TOMBSTONE = 2
 
 
 class HashMap:
+    # Incremental resize state. A step of 0 means resize_table rehashes the whole table at once.
+    _incremental_step = 0
+    _old_buckets = None
+    _old_capacity = 0
+    _migrate_index = 0
+
+    # Number of tombstones in the table, and the share of slots they may fill before the table is compacted.
+    _tombstones = 0
+    _max_tombstone_ratio = 0.25
+
+    # Hot paths index self._buckets._data, the list behind the DynamicArray, instead of the DynamicArray itself.
+    # That skips the three Python calls and the bounds check of each DynamicArray access; the indices used are
+    # always below the capacity, so they are in range.
+
+    # Collision resolution, see set_probing.
+    _probing = QuadraticProbing()
+
+    # Probe counters for put, get, contains_key and remove, see probe_counters.
+    _probe_total = 0
+    _probe_operations = 0
+    _probe_longest = 0
+
+    # Bumped whenever a key is added or removed or entries move between slots, see HashMapIterator.
+    _modifications = 0
+
     def __init__(self, capacity: int, function) -> None:
         """
         Initialize new HashMap that uses
@@ -81,55 +370,151 @@ class HashMap:
 
     # ------------------------------------------------------------------ #
 
+    @classmethod
+    def from_items(cls, iterable, function, expected_size: int = None) -> "HashMap":
+        """
+        Builds a new map from an iterable of (key, value) pairs in one pass. The capacity is sized once from the
+        number of pairs (or expected_size if larger) so the load stays under 0.5 and no resize happens during the
+        load. Later pairs overwrite earlier pairs with the same key.
+        """
+        pairs = list(iterable)
+        if expected_size is None or expected_size < len(pairs):
+            expected_size = len(pairs)
+
+        # Two slots per pair keeps the load factor below 0.5.
+        new_map = cls(max(2 * expected_size + 1, 11), function)
+        new_map.put_many(pairs)
+        return new_map
+
     def put(self, key: str, value: object) -> None:
         """
         First this method will check if the load factor is 0.5 or greater and resize if so.
         Next, adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
         """
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+
         # Check table load is less than 0.5
         if self.table_load() >= 0.5:
-            self.resize_table(self._capacity * 2)
+            if self._incremental_step:
+                self._start_migration(self._capacity * 2)
+            else:
+                self.resize_table(self._capacity * 2)
+        elif (self._size + self._tombstones) / self._capacity >= 0.5:
+            # Mostly tombstones: rehash at the same size so at most half the slots stay in use.
+            self._auto_compact()
+
+        hash = self._hash_function(key)
 
-        hash_index = self._hash_function(key) % self._capacity
+        # New writes always go to the new table, so drop any copy still waiting in the old one.
+        if self._old_buckets is not None and self._remove_from_old(key, hash):
+            self._size -= 1
 
-        if self._buckets[hash_index] is not None:
-            if self._buckets[hash_index].key != key:
-                hash_index = self.quadratic_prob(hash_index, key)
+        try:
+            previous, probes = self._probing.put(self._buckets._data, self._capacity, HashEntry(key, value, hash))
+        except ProbeLimitException:
+            # No free slot on this key's probe path: drop the tombstones, or grow if there are none, and retry.
+            if self._tombstones:
+                self.compact()
+            else:
+                self.resize_table(self._capacity * 2)
+            self.put(key, value)
+            return
+        self._count_probes(probes)
 
-        if self._buckets[hash_index] is None:
+        if previous is None:
             self._size += 1
-        elif self._buckets[hash_index].is_tombstone is True:
+            self._modifications += 1
+        elif previous.is_tombstone is True:
             self._size += 1
+            self._tombstones -= 1
+            self._modifications += 1
 
-        self._buckets[hash_index] = HashEntry(key, value)
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable, in order. All keys are hashed up front and the table is
+        grown (or compacted) at most once, for the case where every key is new, so no resize happens during the
+        batch unless a probe path fills up. An incremental resize in progress is finished first.
+        """
+        pairs = list(pairs)
+        self._finish_migration()
+        hashes = self._hash_many([key for key, _ in pairs])
+
+        # Grow the same way one put at a time would, so the load stays below 0.5.
+        capacity = self._capacity
+        while (self._size + len(pairs) - 1) / capacity >= 0.5:
+            capacity = self._next_prime(capacity * 2)
+        if capacity != self._capacity:
+            self.resize_table(capacity)
+        elif self._tombstones and (self._size + self._tombstones + len(pairs) - 1) / capacity >= 0.5:
+            self.compact()
+
+        buckets, capacity, probing = self._buckets._data, self._capacity, self._probing
+        size = self._size
+        for index in range(len(pairs)):
+            key, value = pairs[index]
+            try:
+                previous, probes = probing.put(buckets, capacity, HashEntry(key, value, hashes[index]))
+            except ProbeLimitException:
+                # Let put compact or grow the table, then carry on in the new one.
+                self.put(key, value)
+                buckets, capacity = self._buckets._data, self._capacity
+                continue
+            self._count_probes(probes)
+            if previous is None:
+                self._size += 1
+            elif previous.is_tombstone is True:
+                self._size += 1
+                self._tombstones -= 1
+        if self._size != size:
+            self._modifications += 1
 
     def resize_table(self, new_capacity: int) -> None:
         """
         Resizes the table if the size passed is > 1. The function will verify the size is a prime number and if not,
         resize the table to the next prime number.
         """
+        self._finish_migration()
+
         # Verify new_capacity is a valid prime number.
         if new_capacity < self._size:
             return
         if not self._is_prime(new_capacity):
             new_capacity = self._next_prime(new_capacity)
 
-        # Create an array of the data to be transferred over and clear the list.
-        data_transfer = self.get_keys_and_values()
-        self.clear()
+        # Grow the same way re-putting every pair would, so the load stays below 0.5.
+        while (self._size - 1) / new_capacity >= 0.5:
+            new_capacity = self._next_prime(new_capacity * 2)
 
-        # Upsize or downsize the map as required.
-        if new_capacity > self._capacity:
-            for index in range(self._capacity, new_capacity):
-                self._buckets.append(None)
-        else:
-            for index in range(self._capacity, new_capacity, - 1):
-                self._buckets.pop()
-        self._capacity = new_capacity
+        self._place_all(((self._buckets._data, 0, self._capacity),), new_capacity)
 
-        # Add the data to the new map.
-        for index in range(data_transfer.length()):
-            self.put(data_transfer[index][0], data_transfer[index][1])
+    def _place_all(self, sources: tuple, new_capacity: int) -> None:
+        """
+        Moves the live entries of the (buckets, start, end) slot ranges in sources into a new table of new_capacity,
+        using their cached hashes. Entries go straight from the old slots to the new ones without being collected
+        first. If a probe path fills up the capacity is doubled and placement starts over.
+        """
+        probing = self._probing
+        while True:
+            buckets = DynamicArray([None] * new_capacity)
+            slots = buckets._data
+            size = 0
+            try:
+                for old, start, end in sources:
+                    for index in range(start, end):
+                        entry = old[index]
+                        if entry is not None and entry.is_tombstone is False:
+                            probing.put(slots, new_capacity, entry)
+                            size += 1
+                break
+            except ProbeLimitException:
+                new_capacity = self._next_prime(new_capacity * 2)
+
+        self._buckets = buckets
+        self._capacity = new_capacity
+        self._size = size
+        self._tombstones = 0
+        self._modifications += 1
 
     def table_load(self) -> float:
         """
@@ -139,73 +524,136 @@ class HashMap:
 
     def empty_buckets(self) -> int:
         """
-        Returns the number of empty buckets within the map.
+        Returns the number of empty buckets within the map. Tombstones are not empty, since probes still walk
+        through them.
         """
-        """count = 0
-        for index in range(self._capacity):
-            if self._buckets[index] is None or self._buckets[index].is_tombstone is True:
-                count += 1"""
-        return self._capacity - self._size
+        return self._capacity - self._size - self._tombstones
 
     def get(self, key: str) -> object:
         """
         Returns the value associated with the key or None if the key is not in the map.
         """
-        hash_index = self._hash_function(key) % self._capacity
-        if self._buckets[hash_index] is None or self._buckets[hash_index].is_tombstone is True:
+        hash = self._hash_function(key)
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+        if self._old_buckets is not None:
+            entry = self._find_in_old(key, hash)
+            if entry is not None:
+                return entry.value
+
+        index, probes = self._probing.find(self._buckets._data, self._capacity, key, hash)
+        self._count_probes(probes)
+        if index < 0:
             return None
-        elif self._buckets[hash_index].key == key:
-            return self._buckets[hash_index].value
-        else:
-            hash_index = self.quadratic_prob(hash_index, key)
-            if self._buckets[hash_index] is None or self._buckets[hash_index].is_tombstone is True:
-                return None
-            elif self._buckets[hash_index].key == key:
-                return self._buckets[hash_index].value
+        return self._buckets._data[index].value
+
+    def increment(self, key: str, delta: int = 1) -> object:
+        """
+        Adds delta to the value of key in place and returns the new value. A missing key starts from 0.
+        """
+        hash = self._hash_function(key)
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+        if self._old_buckets is not None:
+            entry = self._find_in_old(key, hash)
+            if entry is not None:
+                entry.value += delta
+                return entry.value
+
+        index, probes = self._probing.find(self._buckets._data, self._capacity, key, hash)
+        self._count_probes(probes)
+        if index < 0:
+            self.put(key, delta)
+            return delta
+        entry = self._buckets._data[index]
+        entry.value += delta
+        return entry.value
+
+    def get_many(self, keys) -> list:
+        """
+        Returns a list of the values of keys, in order, with None for keys that are not in the map.
+        """
+        # _find_many may finish a resize that replaces the table, so the table is read after it.
+        indexes = self._find_many(keys)
+        buckets = self._buckets._data
+        return [None if index < 0 else buckets[index].value for index in indexes]
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list of True or False for each key, in order.
+        """
+        return [index >= 0 for index in self._find_many(keys)]
 
     def contains_key(self, key: str) -> bool:
         """
         Returns True or False based on whether or not the key is in the map.
         """
-        hash_index = self._hash_function(key) % self._capacity
-        if self._buckets[hash_index] is None or self._buckets[hash_index].is_tombstone is True:
-            return False
-        elif self._buckets[hash_index].key == key:
+        hash = self._hash_function(key)
+        if self._old_buckets is not None and self._find_in_old(key, hash) is not None:
             return True
-        else:
-            hash_index = self.quadratic_prob(hash_index, key)
-            if self._buckets[hash_index]is None:
-                return False
-            else:
-                return True
+
+        index, probes = self._probing.find(self._buckets._data, self._capacity, key, hash)
+        self._count_probes(probes)
+        return index >= 0
 
     def remove(self, key: str) -> None:
         """
         Removes a key from the map.
         """
-        hash_index = self._hash_function(key) % self._capacity
-        if self._buckets[hash_index] is None:
+        hash = self._hash_function(key)
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+        if self._old_buckets is not None and self._remove_from_old(key, hash):
+            self._size -= 1
+            self._modifications += 1
             return
-        elif self._buckets[hash_index].key == key and self._buckets[hash_index].is_tombstone is False:
-            self._buckets[hash_index].is_tombstone = True
+
+        index, probes = self._probing.find(self._buckets._data, self._capacity, key, hash)
+        self._count_probes(probes)
+        if index >= 0:
             self._size -= 1
-        else:
-            hash_index = self.quadratic_prob(hash_index, key)
-            if self._buckets[hash_index] is None:
-                return
-            elif self._buckets[hash_index].key == key and self._buckets[hash_index].is_tombstone is False:
-                self._buckets[hash_index].is_tombstone = True
+            self._modifications += 1
+            if self._probing.delete(self._buckets._data, self._capacity, index):
+                self._tombstones += 1
+                if self._tombstones / self._capacity >= self._max_tombstone_ratio:
+                    self._auto_compact()
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an iterable that is in the map. The tombstone ratio is checked once, after the
+        batch.
+        """
+        keys = list(keys)
+        self._finish_migration()
+        hashes = self._hash_many(keys)
+        buckets, capacity, probing = self._buckets._data, self._capacity, self._probing
+        size = self._size
+        for index in range(len(keys)):
+            slot, probes = probing.find(buckets, capacity, keys[index], hashes[index])
+            self._count_probes(probes)
+            if slot >= 0:
                 self._size -= 1
-        return
+                if probing.delete(buckets, capacity, slot):
+                    self._tombstones += 1
+        if self._size != size:
+            self._modifications += 1
+        if self._tombstones / self._capacity >= self._max_tombstone_ratio:
+            self._auto_compact()
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
         """
         our_array = DynamicArray()
-        for index in range(self._capacity):
-            if self._buckets[index] is not None and self._buckets[index].is_tombstone is False:
-                our_array.append((self._buckets[index].key, self._buckets[index].value))
+        for entry in self._buckets._data:
+            if entry is not None and entry.is_tombstone is False:
+                our_array.append((entry.key, entry.value))
+
+        # Entries not yet moved by an incremental resize.
+        for index in range(self._migrate_index, self._old_capacity if self._old_buckets is not None else 0):
+            entry = self._old_buckets._data[index]
+            if entry is not None and entry.is_tombstone is False:
+                our_array.append((entry.key, entry.value))
 
         return our_array
 
@@ -217,41 +665,263 @@ class HashMap:
         for _ in range(self._capacity):
             self._buckets.append(None)
         self._size = 0
+        self._tombstones = 0
+        self._old_buckets = None
+        self._modifications += 1
+
+    def keys(self) -> KeysView:
+        """Returns a live view of the keys of the map."""
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """Returns a live view of the values of the map."""
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """Returns a live view of the (key, value) pairs of the map."""
+        return ItemsView(self)
+
+    def _iterator(self, kind: int) -> HashMapIterator:
+        """Returns a new iterator over the map, see HashMapIterator."""
+        return HashMapIterator(self, kind)
 
-    def __iter__(self):
+    def __iter__(self) -> HashMapIterator:
         """
-        Iterator for loop
+        Iterator for loop. Yields the live HashEntry objects; each loop gets its own iterator.
         """
-        self._index = 0
-        while self._buckets[self._index] is None or self._buckets[self._index].is_tombstone is True:
-            self._index += 1
-        return self
+        return HashMapIterator(self, _ENTRIES)
 
-    def __next__(self):
+    def _find_many(self, keys) -> list:
         """
-        Finds next value and advances iter
+        Returns the slot index of each key, or -1, in order. An incremental resize in progress is finished first.
+        """
+        keys = list(keys)
+        self._finish_migration()
+        hashes = self._hash_many(keys)
+        buckets, capacity, find = self._buckets._data, self._capacity, self._probing.find
+        indexes = []
+        for index in range(len(keys)):
+            slot, probes = find(buckets, capacity, keys[index], hashes[index])
+            self._count_probes(probes)
+            indexes.append(slot)
+        return indexes
+
+    def _hash_many(self, keys: list) -> list:
+        """Returns the hash of each key, in order, vectorized with NumPy when hash_batch can."""
+        return hash_batch.hash_many(self._hash_function, keys)
+
+    def quadratic_prob(self, index: int, key: str, hash: int = None) -> int:
+        """
+        Finds the index of the live entry for key, or the first empty index, via quadratic probing.
+        If hash is given, entries with a different cached hash are skipped without comparing keys.
+        Raises ProbeLimitException once the probes start repeating without finding either.
         """
-        try:
-            value = self._buckets[self._index]
-        except IndexError:
-            raise StopIteration
-
-        if value is None or value.is_tombstone is True:
-            raise StopIteration
-        self._index = self._index + 1
-        return value
-
-    def quadratic_prob(self, index: int, key: str) -> int:
-        """Finds the next index via quadratic probing"""
         counter = 0
         original_index = index
         while self._buckets[index] is not None:
-            if self._buckets[index].key == key:
+            entry = self._buckets[index]
+            if (hash is None or entry.hash == hash) and entry.key == key and entry.is_tombstone is False:
                 return index
             counter += 1
+            if counter > self._capacity // 2:
+                raise ProbeLimitException
             index = (original_index + (counter ** 2)) % self._capacity
         return index
 
+    def probe_counters(self) -> tuple[float, int]:
+        """
+        Returns the average and the longest number of slots looked at by put, get, contains_key and remove
+        since the map was created or reset_probe_counters was called.
+        """
+        average = self._probe_total / self._probe_operations if self._probe_operations else 0.0
+        return average, self._probe_longest
+
+    def reset_probe_counters(self) -> None:
+        """Sets the probe counters back to zero."""
+        self._probe_total = 0
+        self._probe_operations = 0
+        self._probe_longest = 0
+
+    def _count_probes(self, probes: int) -> None:
+        """Adds one operation that looked at `probes` slots to the probe counters."""
+        self._probe_total += probes
+        self._probe_operations += 1
+        if probes > self._probe_longest:
+            self._probe_longest = probes
+
+    def set_probing(self, probing: ProbingStrategy) -> None:
+        """
+        Switches the collision resolution strategy, e.g. LinearProbing(), DoubleHashing() or RobinHoodHashing(),
+        and rehashes the entries into their places under it.
+        """
+        self._finish_migration()
+        self._probing = probing
+        self.compact()
+
+    def probe_stats(self) -> tuple[float, int]:
+        """
+        Returns the average and the longest number of slots a lookup of a key in the map looks at,
+        taken over every entry in the table.
+        """
+        self._finish_migration()
+        total = longest = 0
+        buckets = self._buckets._data
+        for index in range(self._capacity):
+            if buckets[index] is not None and buckets[index].is_tombstone is False:
+                length = self._probing.probe_length(buckets, self._capacity, index)
+                total += length
+                longest = max(longest, length)
+        return (total / self._size if self._size else 0.0), longest
+
+    def compact(self) -> None:
+        """Rehashes the entries at the same capacity, which drops every tombstone."""
+        self.resize_table(self._capacity)
+
+    def _auto_compact(self) -> None:
+        """
+        Compacts the table once put or remove finds too many tombstones. With incremental resizing on, the entries
+        move to a fresh table a few slots per operation, like a resize, instead of all at once: at the same
+        capacity if the move finishes before the load factor can reach 0.5, otherwise at twice the capacity.
+        Tombstones found while a resize is in progress wait for it to finish.
+        """
+        if not self._incremental_step:
+            self.compact()
+        elif self._old_buckets is None:
+            # Every operation moves _incremental_step slots, so at most this many puts happen during the move.
+            capacity = self._capacity
+            if self._size + capacity // self._incremental_step + 1 >= capacity / 2:
+                capacity *= 2
+            self._start_migration(capacity)
+
+    def set_max_tombstone_ratio(self, ratio: float) -> None:
+        """Sets the share of slots tombstones may fill before remove compacts the table."""
+        self._max_tombstone_ratio = ratio
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the map to path in a binary snapshot that keeps the slot layout: the capacity, the hash function,
+        the probing strategy and every live entry and tombstone with its slot and cached hash. Values are pickled.
+        Tombstones are kept because later entries may have been probed past them.
+        """
+        self._finish_migration()
+        positions = array('Q')
+        states = bytearray()
+        hashes, keys, values = [], [], []
+        buckets = self._buckets._data
+        for index in range(self._capacity):
+            entry = buckets[index]
+            if entry is not None:
+                positions.append(index)
+                states.append(_SNAPSHOT_TOMBSTONE if entry.is_tombstone else _SNAPSHOT_LIVE)
+                hashes.append(entry.hash)
+                keys.append(entry.key)
+                values.append(entry.value)
+        write_snapshot(path, _SNAPSHOT_MAGIC, self._hash_function, _SNAPSHOT_PROBING.index(type(self._probing)),
+                       self._capacity, self._size, positions, states, hashes, keys, values)
+
+    @classmethod
+    def load(cls, path: str, function: callable = None, probing: ProbingStrategy = None) -> "HashMap":
+        """
+        Reads a map written by dump. Every entry goes back into its saved slot with its saved hash, so nothing
+        is rehashed and no resize happens. function is needed only if the map used a hash function the snapshot
+        cannot name, such as a keyed one; probing only if it used a strategy with non-default settings.
+        The keys and values are unpickled, so only load snapshots from a trusted source.
+        """
+        function, probing_id, capacity, size, positions, states, hashes, keys, values = read_snapshot(
+            path, _SNAPSHOT_MAGIC, function)
+        if probing_id >= len(_SNAPSHOT_PROBING) or not cls._is_prime(capacity) \
+                or states.count(_SNAPSHOT_LIVE) != size or states.count(_SNAPSHOT_TOMBSTONE) != len(keys) - size \
+                or len(set(positions)) != len(positions):
+            raise ValueError(path + " is damaged")
+        new_map = cls(capacity, function)
+        new_map._probing = _SNAPSHOT_PROBING[probing_id]() if probing is None else probing
+        buckets = new_map._buckets._data
+        for record in range(len(keys)):
+            entry = HashEntry(keys[record], values[record], hashes[record])
+            if states[record] == _SNAPSHOT_TOMBSTONE:
+                entry.is_tombstone = True
+                new_map._tombstones += 1
+            buckets[positions[record]] = entry
+        new_map._size = size
+        return new_map
+
+    def set_incremental_resize(self, step: int = 16) -> None:
+        """
+        Turns on incremental resizing. When the load factor reaches 0.5 the entries are moved to the bigger table
+        a few slots at a time: every put, get and remove moves `step` slots of the old table, and lookups check both
+        tables until the move is done. A step of 2 or more always finishes before the next resize is due.
+        A step of 0 goes back to resizing the whole table at once.
+        """
+        if step <= 0:
+            self._finish_migration()
+            step = 0
+        self._incremental_step = step
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """Swaps in an empty table of the new capacity and keeps the current one around as the old table."""
+        self._finish_migration()
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._migrate_index = 0
+
+        self._capacity = self._next_prime(new_capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
+        self._tombstones = 0
+        self._modifications += 1
+
+    def _migrate(self, count: int) -> None:
+        """Moves up to count slots of the old table into the new table."""
+        old = self._old_buckets._data
+        while count > 0 and self._migrate_index < self._old_capacity:
+            entry = old[self._migrate_index]
+            if entry is not None and entry.is_tombstone is False:
+                # A live key in the old table was never written to the new one, so this fills a free slot.
+                try:
+                    if self._probing.put(self._buckets._data, self._capacity, entry)[0] is not None:
+                        self._tombstones -= 1
+                except ProbeLimitException:
+                    self._abort_migration()
+                    return
+                old[self._migrate_index] = _MIGRATED
+                self._modifications += 1
+            elif entry is not None:
+                # Let go of tombstones as they are passed, so dropping the old table frees nothing else.
+                old[self._migrate_index] = _MIGRATED
+            self._migrate_index += 1
+            count -= 1
+
+        if self._migrate_index >= self._old_capacity:
+            self._old_buckets = None
+            self._old_capacity = 0
+            self._migrate_index = 0
+
+    def _abort_migration(self) -> None:
+        """Rebuilds both tables into one table of twice the new capacity, for when the new table has no room."""
+        sources = ((self._buckets._data, 0, self._capacity),
+                   (self._old_buckets._data, self._migrate_index, self._old_capacity))
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+        self._place_all(sources, self._next_prime(self._capacity * 2))
+
+    def _finish_migration(self) -> None:
+        """Moves everything left in the old table so only one table is in use."""
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity - self._migrate_index)
+
+    def _find_in_old(self, key: str, hash: int) -> HashEntry:
+        """Returns the live entry for key in the old table, or None if it is not there."""
+        old = self._old_buckets._data
+        index = self._probing.find(old, self._old_capacity, key, hash)[0]
+        return None if index < 0 else old[index]
+
+    def _remove_from_old(self, key: str, hash: int) -> bool:
+        """Tombstones key in the old table. Returns True if it was there."""
+        entry = self._find_in_old(key, hash)
+        if entry is None:
+            return False
+        entry.is_tombstone = True
+        return True
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
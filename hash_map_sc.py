@@ -2,11 +2,70 @@
 # Description: Implement a hash map via chaining and open addressing.
 
 
-from a6_include import (DynamicArray, LinkedList,
-                        hash_function_1, hash_function_2)
+from array import array
+
+import hash_batch
+from a6_include import (ITER_KEYS, ITER_VALUES, DynamicArray, HashMapModifiedException, ItemsView, KeysView,
+                        LinkedList, SLNode, ValuesView, hash_function_1, hash_function_2, read_snapshot, write_snapshot)
+
+_SNAPSHOT_MAGIC = b'HMAPSC02'
+
+
+class HashMapIterator:
+    """
+    Iterator over the keys, values or (key, value) items of a separate chaining HashMap. It walks the buckets and
+    their nodes in place, keeping its position on the iterator, so any number of iterators can run at once.
+    Raises HashMapModifiedException if a key is added or removed, or the table is resized, while it runs.
+    """
+
+    def __init__(self, hash_map: "HashMap", kind: int) -> None:
+        """Initialize the iterator at the first bucket. An incremental resize in progress is finished first."""
+        hash_map._finish_migration()
+        self._map = hash_map
+        self._modifications = hash_map._modifications
+        self._kind = kind
+        self._index = 0
+        self._node = None
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next key, value or item and advance the iterator."""
+        hash_map = self._map
+        if hash_map._modifications != self._modifications:
+            raise HashMapModifiedException("HashMap changed during iteration")
+
+        node = self._node
+        while node is None:
+            if self._index >= hash_map._capacity:
+                raise StopIteration
+            node = hash_map._buckets._data[self._index].head()
+            self._index += 1
+        self._node = node.next
+
+        if self._kind == ITER_KEYS:
+            return node.key
+        if self._kind == ITER_VALUES:
+            return node.value
+        return node.key, node.value
 
 
 class HashMap:
+    # Incremental resize state. A step of 0 means resize_table rehashes the whole table at once.
+    _incremental_step = 0
+    _old_buckets = None
+    _old_capacity = 0
+    _migrate_index = 0
+
+    # Bumped whenever a key is added or removed or nodes move between buckets, see HashMapIterator.
+    _modifications = 0
+
+    # Hot paths index self._buckets._data, the list behind the DynamicArray, instead of the DynamicArray itself.
+    # That skips the three Python calls and the bounds check of each DynamicArray access; the indices used are
+    # always hash % capacity, so they are in range.
+
     def __init__(self,
                  capacity: int = 11,
                  function: callable = hash_function_1) -> None:
@@ -84,50 +143,193 @@ class HashMap:
 
     # ------------------------------------------------------------------ #
 
+    @classmethod
+    def from_items(cls, iterable, function: callable = hash_function_1,
+                   expected_size: int = None) -> "HashMap":
+        """
+        Builds a new map from an iterable of (key, value) pairs in one pass. The capacity is sized once from the
+        number of pairs (or expected_size if larger) so no resize happens during the load. Later pairs overwrite
+        earlier pairs with the same key.
+        """
+        pairs = list(iterable)
+        if expected_size is None or expected_size < len(pairs):
+            expected_size = len(pairs)
+
+        # Load factor may reach 1.0 before a resize, so one bucket per pair is enough.
+        new_map = cls(max(expected_size, 11), function)
+        new_map.put_many(pairs)
+        return new_map
+
     def put(self, key: str, value: object) -> None:
         """
         First this method will check if the load factor is 1.0 or greater and resize if so.
         Next, adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
         """
+        node, inserted = self._upsert(key, value)
+        if not inserted:
+            node.value = value
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of key. If the key is not in the map, it is added with the value default first.
+        """
+        return self._upsert(key, default)[0].value
+
+    def update_with(self, key: str, fn: callable, default: object = None) -> object:
+        """
+        Replaces the value of key with fn(value) and returns the new value. A missing key starts from default.
+        """
+        node = self._upsert(key, default)[0]
+        node.value = fn(node.value)
+        return node.value
+
+    def increment(self, key: str, delta: int = 1) -> object:
+        """
+        Adds delta to the value of key and returns the new value. A missing key starts from 0.
+        """
+        node = self._upsert(key, 0)[0]
+        node.value += delta
+        return node.value
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable, in order. All keys are hashed up front and the table is
+        grown at most once, for the case where every key is new, so no resize happens during the batch.
+        An incremental resize in progress is finished first.
+        """
+        pairs = list(pairs)
+        self._finish_migration()
+        hashes = self._hash_many([key for key, _ in pairs])
+
+        # Grow the same way one put at a time would, so the load stays at or below 1.0.
+        capacity = self._capacity
+        while capacity < self._size + len(pairs):
+            capacity = self._next_prime(capacity * 2)
+        if capacity != self._capacity:
+            self.resize_table(capacity)
+
+        buckets, capacity = self._buckets._data, self._capacity
+        size = self._size
+        for index in range(len(pairs)):
+            key, value = pairs[index]
+            hash = hashes[index]
+            bucket = buckets[hash % capacity]
+            node = bucket.contains(key, hash)
+            if node is None:
+                bucket.insert(key, value, hash)
+                self._size += 1
+            else:
+                node.value = value
+        if self._size != size:
+            self._modifications += 1
+
+    def get_many(self, keys) -> list:
+        """
+        Returns a list of the values of keys, in order, with None for keys that are not in the map.
+        """
+        return [None if node is None else node.value for node in self._find_many(keys)]
+
+    def contains_many(self, keys) -> list:
+        """
+        Returns a list of True or False for each key, in order.
+        """
+        return [node is not None for node in self._find_many(keys)]
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an iterable that is in the map.
+        """
+        keys = list(keys)
+        self._finish_migration()
+        hashes = self._hash_many(keys)
+        buckets, capacity = self._buckets._data, self._capacity
+        size = self._size
+        for index in range(len(keys)):
+            hash = hashes[index]
+            if buckets[hash % capacity].remove(keys[index], hash):
+                self._size -= 1
+        if self._size != size:
+            self._modifications += 1
+
+    def _find_many(self, keys) -> list:
+        """Returns the node of each key, or None, in order. An incremental resize in progress is finished first."""
+        keys = list(keys)
+        self._finish_migration()
+        hashes = self._hash_many(keys)
+        buckets, capacity = self._buckets._data, self._capacity
+        return [buckets[hashes[index] % capacity].contains(keys[index], hashes[index]) for index in range(len(keys))]
+
+    def _hash_many(self, keys: list) -> list:
+        """Returns the hash of each key, in order, vectorized with NumPy when hash_batch can."""
+        return hash_batch.hash_many(self._hash_function, keys)
+
+    def _upsert(self, key: str, value: object) -> tuple[SLNode, bool]:
+        """
+        Returns the node holding key and whether it was just inserted. A missing key is inserted with value.
+        The key is hashed once and its chain walked once; an existing node is returned as is for the caller to
+        update in place.
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+
         # Check table load is less than 1.0
         if self.table_load() >= 1.0:
-            self.resize_table(self._capacity * 2)
-
-        hash_index = self._hash_function(key) % self._capacity
-        if self.contains_key(key):
-            self._buckets[hash_index].remove(key)
-            self._buckets[hash_index].insert(key, value)
-        else:
-            self._buckets[hash_index].insert(key, value)
-            self._size += 1
+            if self._incremental_step:
+                self._start_migration(self._capacity * 2)
+            else:
+                self.resize_table(self._capacity * 2)
+
+        hash = self._hash_function(key)
+
+        # A key still waiting in the old table is updated where it is.
+        if self._old_buckets is not None:
+            node = self._find_in_old(key, hash)
+            if node is not None:
+                return node, False
+
+        bucket = self._buckets._data[hash % self._capacity]
+        node = bucket.contains(key, hash)
+        if node is not None:
+            return node, False
+        node = SLNode(key, value, None, hash)
+        bucket.insert_node(node)
+        self._size += 1
+        self._modifications += 1
+        return node, True
 
     def resize_table(self, new_capacity: int) -> None:
         """
         Resizes the table if the size passed is > 1. The function will verify the size is a prime number and if not,
         resize the table to the next prime number.
         """
+        self._finish_migration()
+
         # Verify new_capacity is a valid prime number.
         if new_capacity < 1:
             return
         if not self._is_prime(new_capacity):
             new_capacity = self._next_prime(new_capacity)
 
-        # Create an array of the data to be transferred over and clear the list.
-        data_transfer = self.get_keys_and_values()
-        self.clear()
-
-        # Upsize or downsize the map as required.
-        if new_capacity > self._capacity:
-            for index in range(self._capacity, new_capacity):
-                self._buckets.append(LinkedList())
-        else:
-            for index in range(self._capacity, new_capacity, - 1):
-                self._buckets.pop()
+        # Grow the same way re-putting every pair would, so the load stays at or below 1.0.
+        while new_capacity < self._size:
+            new_capacity = self._next_prime(new_capacity * 2)
+
+        # Relink the nodes straight from the old buckets into the new ones using their cached hashes.
+        old_buckets, old_capacity = self._buckets._data, self._capacity
+        buckets = DynamicArray()
+        for _ in range(new_capacity):
+            buckets.append(LinkedList())
+        new_buckets = buckets._data
+        for index in range(old_capacity):
+            node = old_buckets[index].head()
+            while node is not None:
+                next_node = node.next
+                new_buckets[node.hash % new_capacity].insert_node(node)
+                node = next_node
+
+        self._buckets = buckets
         self._capacity = new_capacity
-
-        # Add the data to the new map.
-        for index in range(data_transfer.length()):
-            self.put(data_transfer[index][0], data_transfer[index][1])
+        self._modifications += 1
 
     def table_load(self) -> float:
         """
@@ -140,8 +342,8 @@ class HashMap:
         Returns the number of empty buckets within the map.
         """
         count = 0
-        for index in range(self._capacity):
-            if self.is_bucket_empty(index):
+        for bucket in self._buckets._data:
+            if bucket.length() == 0:
                 count += 1
         return count
 
@@ -149,8 +351,15 @@ class HashMap:
         """
         This method returns the value associated with the given key or none if the key does not exist.
         """
-        index = self._hash_function(key) % self._capacity
-        element = self._buckets[index].contains(key)
+        hash = self._hash_function(key)
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+        if self._old_buckets is not None:
+            node = self._find_in_old(key, hash)
+            if node is not None:
+                return node.value
+
+        element = self._buckets._data[hash % self._capacity].contains(key, hash)
         if element is None:
             return None
         else:
@@ -160,8 +369,11 @@ class HashMap:
         """
         Returns True if the given key is in the hash map.
         """
-        hash_index = self._hash_function(key) % self._capacity
-        if self._buckets[hash_index].contains(key) is not None:
+        hash = self._hash_function(key)
+        if self._old_buckets is not None and self._find_in_old(key, hash) is not None:
+            return True
+
+        if self._buckets._data[hash % self._capacity].contains(key, hash) is not None:
             return True
         else:
             return False
@@ -170,19 +382,33 @@ class HashMap:
         """
         Removes the given key from the map if applicable.
         """
-        index = self._hash_function(key) % self._capacity
-        if self._buckets[index].remove(key):
+        hash = self._hash_function(key)
+        if self._old_buckets is not None:
+            self._migrate(self._incremental_step)
+        if self._old_buckets is not None:
+            bucket = self._old_bucket(hash)
+            if bucket is not None and bucket.remove(key, hash):
+                self._size -= 1
+                self._modifications += 1
+                return
+
+        if self._buckets._data[hash % self._capacity].remove(key, hash):
             self._size -= 1
+            self._modifications += 1
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
         """
         our_array = DynamicArray()
-        for index in range(self._capacity):
-            if not self.is_bucket_empty(index):
-                for node in self._buckets[index]:
-                    our_array.append((node.key, node.value))
+        for bucket in self._buckets._data:
+            for node in bucket:
+                our_array.append((node.key, node.value))
+
+        # Buckets not yet moved by an incremental resize.
+        for index in range(self._migrate_index, self._old_capacity if self._old_buckets is not None else 0):
+            for node in self._old_buckets[index]:
+                our_array.append((node.key, node.value))
         return our_array
 
     def clear(self) -> None:
@@ -192,6 +418,28 @@ class HashMap:
         for index in range(self._capacity):
             self._buckets[index] = LinkedList()
         self._size = 0
+        self._old_buckets = None
+        self._modifications += 1
+
+    def keys(self) -> KeysView:
+        """Returns a live view of the keys of the map."""
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """Returns a live view of the values of the map."""
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """Returns a live view of the (key, value) pairs of the map."""
+        return ItemsView(self)
+
+    def _iterator(self, kind: int) -> HashMapIterator:
+        """Returns a new iterator over the map, see HashMapIterator."""
+        return HashMapIterator(self, kind)
+
+    def __iter__(self) -> HashMapIterator:
+        """Iterates over the keys of the map."""
+        return HashMapIterator(self, ITER_KEYS)
 
     def is_bucket_empty(self, index: int) -> bool:
         """Returns true or false based on whether or not the bucket is empty."""
@@ -200,6 +448,99 @@ class HashMap:
         else:
             return False
 
+    def dump(self, path: str) -> None:
+        """
+        Writes the map to path in a binary snapshot that keeps the bucket layout: the capacity, the hash function
+        and every node with its bucket and cached hash, in chain order. Values are pickled.
+        """
+        self._finish_migration()
+        positions = array('Q')
+        hashes, keys, values = [], [], []
+        buckets = self._buckets._data
+        for index in range(self._capacity):
+            node = buckets[index].head()
+            while node is not None:
+                positions.append(index)
+                hashes.append(node.hash)
+                keys.append(node.key)
+                values.append(node.value)
+                node = node.next
+        write_snapshot(path, _SNAPSHOT_MAGIC, self._hash_function, 0, self._capacity, self._size,
+                       positions, bytes(len(keys)), hashes, keys, values)
+
+    @classmethod
+    def load(cls, path: str, function: callable = None) -> "HashMap":
+        """
+        Reads a map written by dump. The nodes are relinked into their saved buckets with their saved hashes, so
+        nothing is rehashed and no resize happens. function is needed only if the map used a hash function the
+        snapshot cannot name, such as a keyed one.
+        The keys and values are unpickled, so only load snapshots from a trusted source.
+        """
+        function, _, capacity, size, positions, _, hashes, keys, values = read_snapshot(path, _SNAPSHOT_MAGIC,
+                                                                                         function)
+        if size != len(keys):
+            raise ValueError(path + " is damaged")
+        new_map = cls(capacity, function)
+        buckets = new_map._buckets._data
+        # Nodes go in at the head, so relinking them last to first restores the chain order.
+        for record in range(len(keys) - 1, -1, -1):
+            buckets[positions[record]].insert_node(SLNode(keys[record], values[record], None, hashes[record]))
+        new_map._size = size
+        return new_map
+
+    def set_incremental_resize(self, step: int = 8) -> None:
+        """
+        Turns on incremental resizing. When the load factor reaches 1.0 the nodes are moved to the bigger table a
+        few buckets at a time: every put, get and remove moves `step` buckets of the old table, and lookups check
+        both tables until the move is done. A step of 0 goes back to resizing the whole table at once.
+        """
+        if step <= 0:
+            self._finish_migration()
+            step = 0
+        self._incremental_step = step
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """Swaps in an empty table of the new capacity and keeps the current one around as the old table."""
+        self._finish_migration()
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._migrate_index = 0
+
+        self._capacity = self._next_prime(new_capacity)
+        self._buckets = DynamicArray([LinkedList() for _ in range(self._capacity)])
+        self._modifications += 1
+
+    def _migrate(self, count: int) -> None:
+        """Moves the nodes of up to count old buckets into the new table, relinking the nodes instead of copying."""
+        old_buckets, buckets = self._old_buckets._data, self._buckets._data
+        while count > 0 and self._migrate_index < self._old_capacity:
+            for node in old_buckets[self._migrate_index]:
+                buckets[node.hash % self._capacity].insert_node(node)
+            old_buckets[self._migrate_index] = None
+            self._migrate_index += 1
+            self._modifications += 1
+            count -= 1
+
+        if self._migrate_index >= self._old_capacity:
+            self._old_buckets = None
+            self._old_capacity = 0
+            self._migrate_index = 0
+
+    def _finish_migration(self) -> None:
+        """Moves everything left in the old table so only one table is in use."""
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity - self._migrate_index)
+
+    def _old_bucket(self, hash: int) -> LinkedList:
+        """Returns the old table bucket for a key hash, or None if that bucket was already moved."""
+        return self._old_buckets._data[hash % self._old_capacity]
+
+    def _find_in_old(self, key: str, hash: int):
+        """Returns the node for key in the old table, or None if it is not there."""
+        bucket = self._old_bucket(hash)
+        return None if bucket is None else bucket.contains(key, hash)
+
+
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
     Returns a tuple that contains a dynamic array of the value(s) that occur most and then an integer of the total
@@ -211,13 +552,9 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     mode_nums = DynamicArray()
     mode_occurrence = 0
 
-    # Map each item if it is not already in the map. If it is in the map, increment the value object by 1.
+    # Count each item in place: a new item starts at 1, a seen one is bumped by 1.
     for index in range(da.length()):
-        if map.contains_key(da[index]) is False:
-            map.put(da[index], 1)
-        else:
-            counter = str(map.get(da[index]))
-            map.put(da[index], int(counter) + 1)
+        map.increment(da[index])
 
     # Get a list of each unique object in the list and the count.
     data = map.get_keys_and_values()
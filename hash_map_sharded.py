@@ -0,0 +1,235 @@
+# Name: Mason Hunerkoch
+# Description: Hash map split into shards that each live in their own worker process.
+
+import multiprocessing
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_fnv1a
+
+_ENGINES = {'sc': hash_map_sc, 'oa': hash_map_oa}
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Fibonacci hashing multiplier: spreads any hash over all 64 bits before the top bits pick a shard.
+_GOLDEN_64 = 0x9E3779B97F4A7C15
+
+
+def _serve(connection, engine: str, capacity: int, function: callable) -> None:
+    """
+    Worker process loop: owns one shard map and answers (operation, argument) requests from the connection
+    until it gets 'close'. Each reply is (True, result), or (False, exception) if the operation raised.
+    """
+    shard = _ENGINES[engine].HashMap(capacity, function)
+
+    def items(_):
+        pairs = shard.get_keys_and_values()
+        return [pairs[index] for index in range(pairs.length())]
+
+    operations = {
+        'put': lambda pair: shard.put(*pair),
+        'get': shard.get,
+        'contains_key': shard.contains_key,
+        'remove': shard.remove,
+        'get_size': lambda _: shard.get_size(),
+        'clear': lambda _: shard.clear(),
+        'put_many': shard.put_many,
+        'get_many': shard.get_many,
+        'items': items,
+    }
+    while True:
+        operation, argument = connection.recv()
+        if operation == 'close':
+            connection.close()
+            return
+        try:
+            connection.send((True, operations[operation](argument)))
+        except Exception as exception:
+            connection.send((False, exception))
+
+
+class ShardedHashMap:
+    """
+    HashMap split into a power-of-two number of shards. Each shard is a hash_map_sc or hash_map_oa HashMap
+    running in its own worker process, so shards work on separate cores. A key goes to the shard picked by the
+    top bits of its (mixed) hash.
+
+    Single-key calls cost one round trip to a worker. put_many and get_many send one message per shard for the
+    whole batch and let all shards work at once, which is what makes sharding pay off. Keys and values must be
+    picklable, as must the hash function (a module-level function, not a closure) when workers are spawned.
+    """
+
+    def __init__(self, shards: int = 4, function: callable = hash_function_fnv1a, engine: str = 'oa',
+                 capacity: int = 11) -> None:
+        """Starts one worker process per shard. shards must be a power of two."""
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError("shards must be a power of two")
+        self._hash_function = function
+        self._shift = 64 - (shards.bit_length() - 1)
+        self._connections = []
+        self._workers = []
+        for _ in range(shards):
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve, args=(child, engine, capacity, function), daemon=True)
+            worker.start()
+            child.close()
+            self._connections.append(parent)
+            self._workers.append(worker)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(self._broadcast('get_size'))
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
+        """
+        self._call(self._shard(key), 'put', (key, value))
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the key or None if the key is not in the map.
+        """
+        return self._call(self._shard(key), 'get', key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map.
+        """
+        return self._call(self._shard(key), 'contains_key', key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key from the map if applicable.
+        """
+        self._call(self._shard(key), 'remove', key)
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of an iterable. The pairs are grouped by shard and each shard gets them in
+        one message; all shards work at the same time.
+        """
+        batches = [[] for _ in self._connections]
+        for pair in pairs:
+            batches[self._shard(pair[0])].append(pair)
+        self._scatter('put_many', batches)
+
+    def get_many(self, keys) -> list:
+        """
+        Returns a list of the values of keys, in order, with None for missing keys. Keys are grouped by shard and
+        each shard gets them in one message; all shards work at the same time.
+        """
+        keys = list(keys)
+        batches = [[] for _ in self._connections]
+        positions = [[] for _ in self._connections]
+        for position in range(len(keys)):
+            shard = self._shard(keys[position])
+            batches[shard].append(keys[position])
+            positions[shard].append(position)
+
+        values = [None] * len(keys)
+        for shard, shard_values in enumerate(self._scatter('get_many', batches)):
+            for position, value in zip(positions[shard], shard_values):
+                values[position] = value
+        return values
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
+        """
+        our_array = DynamicArray()
+        for pairs in self._broadcast('items'):
+            for pair in pairs:
+                our_array.append(pair)
+        return our_array
+
+    def clear(self) -> None:
+        """
+        Clears the hash map.
+        """
+        self._broadcast('clear')
+
+    def close(self) -> None:
+        """Stops the worker processes. The map cannot be used afterwards."""
+        for connection in self._connections:
+            connection.send(('close', None))
+            connection.close()
+        for worker in self._workers:
+            worker.join()
+        self._connections = []
+        self._workers = []
+
+    def __enter__(self) -> "ShardedHashMap":
+        """Lets the map be used in a with statement, which closes it at the end."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stops the workers at the end of a with statement."""
+        self.close()
+
+    # ------------------------------------------------------------------ #
+
+    def _shard(self, key: str) -> int:
+        """Returns the shard of key: the top bits of its hash after Fibonacci mixing."""
+        return ((self._hash_function(key) * _GOLDEN_64) & _MASK_64) >> self._shift
+
+    def _call(self, shard: int, operation: str, argument: object) -> object:
+        """Runs one operation on one shard and returns its result."""
+        connection = self._connections[shard]
+        connection.send((operation, argument))
+        return self._result(connection)
+
+    def _scatter(self, operation: str, arguments: list) -> list:
+        """
+        Sends each shard its own argument, then collects the results in shard order. Every shard that was sent a
+        message is read back before anything is raised, even if a later send fails (e.g. on an unpicklable value),
+        so no reply is left in a pipe for the next call to pick up. The first error is raised after that.
+        """
+        sent = []
+        try:
+            for connection, argument in zip(self._connections, arguments):
+                connection.send((operation, argument))
+                sent.append(connection)
+        finally:
+            replies = [connection.recv() for connection in sent]
+        for succeeded, result in replies:
+            if not succeeded:
+                raise result
+        return [result for _, result in replies]
+
+    def _broadcast(self, operation: str) -> list:
+        """Runs an operation with no argument on every shard and returns the results in shard order."""
+        return self._scatter(operation, [None] * len(self._connections))
+
+    @staticmethod
+    def _result(connection) -> object:
+        """Receives a reply and returns its result, raising the exception if the operation failed."""
+        succeeded, result = connection.recv()
+        if not succeeded:
+            raise result
+        return result
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nput, get and remove")
+    print("-------------------")
+    with ShardedHashMap(4) as m:
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+        m.remove('str0')
+        print(m.get_size(), m.get('str0'), m.get('str1'), m.contains_key('str0'), m.contains_key('str149'))
+
+    print("\nput_many and get_many")
+    print("---------------------")
+    with ShardedHashMap(2, engine='sc') as m:
+        m.put_many(('key' + str(i), i) for i in range(1000))
+        print(m.get_size(), m.get_many(['key0', 'key999', 'missing', 'key500']))
+        m.clear()
+        print(m.get_size(), m.get_keys_and_values())
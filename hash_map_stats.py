@@ -0,0 +1,409 @@
+# Name: Mason Hunerkoch
+# Description: Opt-in stats mode for the separate chaining and open addressing maps.
+
+import contextlib
+import time
+
+import hash_batch
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_1, hash_function_2
+
+
+class MapStats:
+    """
+    Counters collected by a map in stats mode. Histograms are dicts of length -> number of lookups.
+    """
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Sets every counter back to zero."""
+        self.operations = {}
+        self.hash_calls = 0
+        self.probe_lengths = {}
+        self.chain_lengths = {}
+        self.resizes = 0
+        self.resize_seconds = 0.0
+        self.entries_moved = 0
+        self.tombstones_seen = 0
+        self.peak_load = 0.0
+        self.scopes = {}
+        # Set while an operation or a resize runs, so calls the map makes to itself are not counted twice.
+        self._in_operation = False
+        self._in_resize = False
+
+    def as_dict(self) -> dict:
+        """Returns a copy of the counters as plain dicts, lists and numbers, ready to hand to a metrics pipeline."""
+        return {
+            'operations': dict(self.operations),
+            'hash_calls': self.hash_calls,
+            'probe_lengths': dict(sorted(self.probe_lengths.items())),
+            'chain_lengths': dict(sorted(self.chain_lengths.items())),
+            'resizes': self.resizes,
+            'resize_seconds': self.resize_seconds,
+            'entries_moved': self.entries_moved,
+            'tombstones_seen': self.tombstones_seen,
+            'peak_load': self.peak_load,
+            'scopes': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.scopes.items()},
+        }
+
+    @contextlib.contextmanager
+    def scope(self, name: str):
+        """Times the body of a with statement and adds it to the calls and seconds of the scope name."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            calls, seconds = self.scopes.get(name, (0, 0.0))
+            self.scopes[name] = (calls + 1, seconds + time.perf_counter() - start)
+
+
+class _CountingProbing(hash_map_oa.ProbingStrategy):
+    """
+    Probing strategy that runs another one and counts the tombstones on every probe path it walks.
+    The path is walked a second time to count them, which only happens in stats mode.
+    """
+
+    def __init__(self, probing: hash_map_oa.ProbingStrategy, stats: MapStats) -> None:
+        """Wraps probing, counting into stats."""
+        self.probing = probing
+        self._stats = stats
+
+    def _step(self, key: str, capacity: int) -> int:
+        return self.probing._step(key, capacity)
+
+    def _next_index(self, home: int, counter: int, step: int, capacity: int) -> int:
+        return self.probing._next_index(home, counter, step, capacity)
+
+    def max_probes(self, capacity: int) -> int:
+        return self.probing.max_probes(capacity)
+
+    def find(self, buckets, capacity: int, key: str, hash: int) -> tuple[int, int]:
+        index, probes = self.probing.find(buckets, capacity, key, hash)
+        self._stats.tombstones_seen += self._tombstones_on_path(buckets, capacity, key, hash, probes)
+        return index, probes
+
+    def put(self, buckets, capacity: int, new_entry) -> tuple:
+        previous, probes = self.probing.put(buckets, capacity, new_entry)
+        # The new entry may have taken a tombstone's slot, so that one is counted from previous.
+        seen = self._tombstones_on_path(buckets, capacity, new_entry.key, new_entry.hash, probes)
+        if previous is not None and previous.is_tombstone is True:
+            seen += 1
+        self._stats.tombstones_seen += seen
+        return previous, probes
+
+    def delete(self, buckets, capacity: int, index: int) -> bool:
+        return self.probing.delete(buckets, capacity, index)
+
+    def probe_length(self, buckets, capacity: int, index: int) -> int:
+        return self.probing.probe_length(buckets, capacity, index)
+
+    def _tombstones_on_path(self, buckets, capacity: int, key: str, hash: int, probes: int) -> int:
+        """Returns the number of tombstones among the first probes slots of the probe path of key."""
+        home = index = hash % capacity
+        step = self.probing._step(key, capacity)
+        count = 0
+        for counter in range(1, probes + 1):
+            entry = buckets[index]
+            if entry is None:
+                break
+            if entry.is_tombstone is True:
+                count += 1
+            index = self.probing._next_index(home, counter, step, capacity)
+        return count
+
+
+class _StatsMixin:
+    """
+    Instrumented overrides shared by SCStatsMap and OAStatsMap. They count each call, then run the map's own
+    method. The hash function is replaced by a counting wrapper behind the _hash_function property.
+    """
+
+    _stats = None
+    _base = None
+
+    def _get_hash_function(self) -> callable:
+        return self._counting_function
+
+    def _set_hash_function(self, function: callable) -> None:
+        stats = self._stats
+
+        def counting_function(key: str) -> int:
+            stats.hash_calls += 1
+            return function(key)
+
+        self._plain_function = function
+        self._counting_function = counting_function
+
+    _hash_function = property(_get_hash_function, _set_hash_function)
+
+    # ------------------------------------------------------------------ #
+
+    def stats(self) -> dict:
+        """Returns the counters collected since stats mode was turned on or reset_stats was called."""
+        return self._stats.as_dict()
+
+    def reset_stats(self) -> None:
+        """Sets every counter back to zero."""
+        self._stats.reset()
+
+    def timing(self, name: str):
+        """Returns a context manager that times its body under name in the scopes of stats()."""
+        return self._stats.scope(name)
+
+    def _operation(self, name: str, key: object, method: callable, *args) -> object:
+        """
+        Counts one call of the operation name, records the lookup of key (if not None), runs method and
+        updates the peak load. Calls the method makes back into the map are not counted again.
+        """
+        stats = self._stats
+        if stats._in_operation:
+            return method(*args)
+        stats._in_operation = True
+        try:
+            stats.operations[name] = stats.operations.get(name, 0) + 1
+            if key is not None:
+                self._record_lookup(key)
+            return method(*args)
+        finally:
+            stats._in_operation = False
+            load = self._size / self._capacity
+            if load > stats.peak_load:
+                stats.peak_load = load
+
+    def _record_lookup(self, key: str) -> None:
+        """Records what a lookup of key is about to walk. Only the separate chaining map has anything to add."""
+
+    def _resize(self, method: callable, *args) -> None:
+        """Runs a resize method, adding its time to the resize counters unless a resize is already running."""
+        stats = self._stats
+        if stats._in_resize:
+            method(*args)
+            return
+        stats._in_resize = True
+        start = time.perf_counter()
+        try:
+            method(*args)
+        finally:
+            stats.resize_seconds += time.perf_counter() - start
+            stats._in_resize = False
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        self._operation('put', key, super().put, key, value)
+
+    def get(self, key: str) -> object:
+        return self._operation('get', key, super().get, key)
+
+    def contains_key(self, key: str) -> bool:
+        return self._operation('contains_key', key, super().contains_key, key)
+
+    def remove(self, key: str) -> None:
+        self._operation('remove', key, super().remove, key)
+
+    def increment(self, key: str, delta: int = 1) -> object:
+        return self._operation('increment', key, super().increment, key, delta)
+
+    def put_many(self, pairs) -> None:
+        self._operation('put_many', None, super().put_many, pairs)
+
+    def get_many(self, keys) -> list:
+        return self._operation('get_many', None, super().get_many, keys)
+
+    def contains_many(self, keys) -> list:
+        return self._operation('contains_many', None, super().contains_many, keys)
+
+    def remove_many(self, keys) -> None:
+        self._operation('remove_many', None, super().remove_many, keys)
+
+    def clear(self) -> None:
+        self._operation('clear', None, super().clear)
+
+    def _hash_many(self, keys: list) -> list:
+        # Hash with the plain function so hash_batch can still vectorize it.
+        self._stats.hash_calls += len(keys)
+        return hash_batch.hash_many(self._plain_function, keys)
+
+    def _start_migration(self, new_capacity: int) -> None:
+        self._finish_migration()
+        self._stats.resizes += 1
+        self._stats.entries_moved += self._size
+        self._resize(super()._start_migration, new_capacity)
+
+    def _migrate(self, count: int) -> None:
+        self._resize(super()._migrate, count)
+
+    def dump(self, path: str) -> None:
+        # The snapshot names the hash function and probing strategy, so it is written from the plain map.
+        stats = disable_stats(self)
+        try:
+            self.dump(path)
+        finally:
+            _attach(self, stats)
+
+
+class SCStatsMap(_StatsMixin, hash_map_sc.HashMap):
+    """
+    hash_map_sc.HashMap in stats mode. Besides the shared counters it records the length of the chain each
+    single-key lookup walks. Doing so hashes the key a second time with the plain function, which is not
+    counted in hash_calls.
+    """
+
+    _base = hash_map_sc.HashMap
+
+    def __init__(self, capacity: int = 11, function: callable = hash_function_1) -> None:
+        """Initialize an empty map with stats mode on."""
+        self._stats = MapStats()
+        super().__init__(capacity, function)
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        return self._operation('setdefault', key, super().setdefault, key, default)
+
+    def update_with(self, key: str, fn: callable, default: object = None) -> object:
+        return self._operation('update_with', key, super().update_with, key, fn, default)
+
+    def resize_table(self, new_capacity: int) -> None:
+        self._finish_migration()
+        if new_capacity >= 1:
+            self._stats.resizes += 1
+            self._stats.entries_moved += self._size
+        self._resize(super().resize_table, new_capacity)
+
+    def _record_lookup(self, key: str) -> None:
+        hash = self._plain_function(key)
+        bucket = None
+        if self._old_buckets is not None:
+            # During an incremental resize a key still in the old table is found in its old chain.
+            bucket = self._old_bucket(hash)
+            if bucket is not None and bucket.contains(key, hash) is None:
+                bucket = None
+        if bucket is None:
+            bucket = self._buckets._data[hash % self._capacity]
+        length = bucket.length()
+        self._stats.chain_lengths[length] = self._stats.chain_lengths.get(length, 0) + 1
+
+
+class OAStatsMap(_StatsMixin, hash_map_oa.HashMap):
+    """
+    hash_map_oa.HashMap in stats mode. Besides the shared counters it records the probe length of every lookup
+    in the probe counters, and the tombstones passed on the way, through a counting wrapper around the probing
+    strategy kept behind the _probing property.
+    """
+
+    _base = hash_map_oa.HashMap
+
+    def __init__(self, capacity: int = 11, function: callable = hash_function_1) -> None:
+        """Initialize an empty map with stats mode on."""
+        self._stats = MapStats()
+        self._probing = hash_map_oa.HashMap._probing
+        super().__init__(capacity, function)
+
+    def _get_probing(self) -> hash_map_oa.ProbingStrategy:
+        return self._counting_probing
+
+    def _set_probing(self, probing: hash_map_oa.ProbingStrategy) -> None:
+        self._counting_probing = _CountingProbing(probing, self._stats)
+
+    _probing = property(_get_probing, _set_probing)
+
+    def _count_probes(self, probes: int) -> None:
+        super()._count_probes(probes)
+        self._stats.probe_lengths[probes] = self._stats.probe_lengths.get(probes, 0) + 1
+
+    def _place_all(self, sources: tuple, new_capacity: int) -> None:
+        self._stats.resizes += 1
+        self._resize(super()._place_all, sources, new_capacity)
+        self._stats.entries_moved += self._size
+
+
+_STATS_CLASSES = {hash_map_sc.HashMap: SCStatsMap, hash_map_oa.HashMap: OAStatsMap}
+
+
+def _attach(hash_map, stats: MapStats) -> None:
+    """Switches a plain map to its stats class, counting into stats."""
+    stats_class = _STATS_CLASSES[type(hash_map)]
+    function = hash_map.__dict__.pop('_hash_function')
+    probing = hash_map.__dict__.pop('_probing', hash_map._probing) if stats_class is OAStatsMap else None
+    hash_map.__class__ = stats_class
+    hash_map._stats = stats
+    hash_map._hash_function = function
+    if probing is not None:
+        hash_map._probing = probing
+
+
+def enable_stats(hash_map) -> MapStats:
+    """
+    Turns on stats mode for a hash_map_sc or hash_map_oa HashMap, in place, and returns its counters. The map
+    keeps its contents; only its class changes, so maps that never enter stats mode run exactly as before.
+    Raises TypeError for any other kind of map.
+    """
+    if isinstance(hash_map, _StatsMixin):
+        return hash_map._stats
+    if type(hash_map) not in _STATS_CLASSES:
+        raise TypeError("stats mode needs a hash_map_sc or hash_map_oa HashMap")
+    stats = MapStats()
+    _attach(hash_map, stats)
+    return stats
+
+
+def disable_stats(hash_map) -> MapStats:
+    """Turns stats mode off again and returns the counters collected, or None if it was not on."""
+    if not isinstance(hash_map, _StatsMixin):
+        return None
+    stats = hash_map._stats
+    function = hash_map._plain_function
+    probing = hash_map._probing.probing if isinstance(hash_map, OAStatsMap) else None
+    for name in ('_stats', '_plain_function', '_counting_function', '_counting_probing'):
+        hash_map.__dict__.pop(name, None)
+    hash_map.__class__ = hash_map._base
+    hash_map._hash_function = function
+    if probing is not None:
+        hash_map._probing = probing
+    return stats
+
+
+@contextlib.contextmanager
+def collecting(hash_map):
+    """Turns on stats mode for the body of a with statement and yields the counters."""
+    stats = enable_stats(hash_map)
+    try:
+        yield stats
+    finally:
+        disable_stats(hash_map)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nseparate chaining")
+    print("-----------------")
+    m = SCStatsMap(11, hash_function_2)
+    with m.timing('load'):
+        for i in range(100):
+            m.put('key' + str(i), i)
+    for i in range(0, 100, 3):
+        m.get('key' + str(i))
+    m.remove('key1')
+    m.get_many(['key2', 'key3', 'missing'])
+    for name, value in m.stats().items():
+        print(name, value if name not in ('resize_seconds', 'scopes') else '...')
+
+    print("\nopen addressing, turned on for a scope")
+    print("--------------------------------------")
+    m = hash_map_oa.HashMap(11, hash_function_2)
+    for i in range(50):
+        m.put('str' + str(i), i)
+    with collecting(m) as stats:
+        for i in range(0, 50, 2):
+            m.remove('str' + str(i))
+        for i in range(50):
+            m.contains_key('str' + str(i))
+    print(type(m).__name__, m.get_size(), m.get('str1'))
+    for name, value in stats.as_dict().items():
+        print(name, value if name not in ('resize_seconds', 'scopes') else '...')
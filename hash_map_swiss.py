@@ -0,0 +1,413 @@
+# Name: Mason Hunerkoch
+# Description: Swiss table hash map: open addressing over groups of 16 slots with a control byte per slot.
+
+from array import array
+
+from a6_include import (ITER_ITEMS, ITER_KEYS, ITER_VALUES, DynamicArray, HashEntry, HashMapModifiedException,
+                        ItemsView, KeysView, ValuesView, hash_function_1, hash_function_2)
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Fibonacci hashing multiplier: spreads any hash over all 64 bits, so weak hashes still fill every group.
+_GOLDEN_64 = 0x9E3779B97F4A7C15
+
+# Control byte of a slot. A full slot holds the 7-bit fingerprint of its key (0x00 - 0x7F), so the high bit is set
+# only for EMPTY and DELETED, and a fingerprint never matches either.
+_EMPTY = 0x80
+_DELETED = 0xFE
+
+_GROUP_WIDTH = 16
+_GROUP_BITS = 4
+
+# What a HashMapIterator yields besides ITER_KEYS, ITER_VALUES and ITER_ITEMS.
+_ENTRIES = 3
+
+
+class HashMapIterator:
+    """
+    Iterator over the keys, values, (key, value) items or HashEntry copies of the full slots of a HashMap.
+    Raises HashMapModifiedException if a key is added or removed, or the table is rebuilt, while it runs.
+    """
+
+    __slots__ = ('_map', '_modifications', '_kind', '_index')
+
+    def __init__(self, hash_map: "HashMap", kind: int) -> None:
+        """Initialize the iterator at the first slot."""
+        self._map = hash_map
+        self._modifications = hash_map._modifications
+        self._kind = kind
+        self._index = 0
+
+    def __iter__(self) -> "HashMapIterator":
+        """Return the iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next key, value, item or entry and advance the iterator."""
+        hash_map = self._map
+        if hash_map._modifications != self._modifications:
+            raise HashMapModifiedException("HashMap changed during iteration")
+
+        control, capacity, index = hash_map._control, hash_map._capacity, self._index
+        while index < capacity and control[index] & _EMPTY:
+            index += 1
+        if index >= capacity:
+            self._index = index
+            raise StopIteration
+        self._index = index + 1
+        if self._kind == ITER_KEYS:
+            return hash_map._keys[index]
+        if self._kind == ITER_VALUES:
+            return hash_map._values[index]
+        if self._kind == ITER_ITEMS:
+            return hash_map._keys[index], hash_map._values[index]
+        return hash_map._entry(index)
+
+
+class HashMap:
+    """
+    Swiss table HashMap with the same interface as hash_map_oa.HashMap. Slots are split into groups of 16, and a
+    bytearray keeps one control byte per slot: EMPTY, DELETED, or a 7-bit fingerprint of the key's hash. A lookup
+    scans the 16 control bytes of a group for the key's fingerprint with bytearray.find, which runs in C, and
+    only the slots that match have their cached hash and key compared; a slot holding another key matches by
+    chance about 1 time in 128. If the group has an EMPTY slot the key is not in the table; otherwise the probe
+    moves on to the next group (triangular probing over a power-of-two number of groups).
+
+    The table may fill up to 7/8 of its slots, counting DELETED ones, before it grows or is rehashed. Keys, values
+    and the mixed 64-bit hashes live in parallel arrays, so nothing is rehashed on resize.
+    The capacity is always a power of two of at least 16.
+    """
+
+    __slots__ = ('_capacity', '_hash_function', '_size', '_modifications', '_tombstones', '_group_mask',
+                 '_group_shift', '_fingerprint_shift', '_control', '_hashes', '_keys', '_values')
+
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses
+        Swiss table groups for collision resolution
+        """
+        self._capacity = self._round_capacity(capacity)
+        self._hash_function = function
+        self._size = 0
+        self._modifications = 0
+        self._tombstones = 0
+        self._allocate()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            out += str(i) + ': ' + str(self._entry(i)) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def from_items(cls, iterable, function, expected_size: int = None) -> "HashMap":
+        """
+        Builds a new map from an iterable of (key, value) pairs. The capacity is sized once from the number of
+        pairs (or expected_size if larger) so no resize happens during the load.
+        """
+        pairs = list(iterable)
+        if expected_size is None or expected_size < len(pairs):
+            expected_size = len(pairs)
+
+        new_map = cls(expected_size * 8 // 7 + 1, function)
+        for key, value in pairs:
+            new_map.put(key, value)
+        return new_map
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a new key value pair to the hash map. If the key already exists, it overwrites the existing value.
+        A new key that would take an EMPTY slot while 7/8 of the slots are full or deleted grows or rehashes the
+        table first; overwrites and reused DELETED slots never do.
+        """
+        hash = self._hash(key)
+        index = self._insert_index(key, hash)
+        if self._control[index] == _EMPTY and self._size + self._tombstones >= self._capacity * 7 // 8:
+            # Mostly tombstones: rehash at the same size. Otherwise grow.
+            if self._size * 32 <= self._capacity * 25:
+                self.resize_table(self._capacity)
+            else:
+                self.resize_table(self._capacity * 2)
+            index = self._free_index(hash)
+
+        if self._control[index] & _EMPTY:
+            if self._control[index] == _DELETED:
+                self._tombstones -= 1
+            self._control[index] = self._fingerprint(hash)
+            self._hashes[index] = hash
+            self._keys[index] = key
+            self._size += 1
+            self._modifications += 1
+        self._values[index] = value
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the table if the size passed is at least the number of entries. The capacity is rounded up to a
+        power of two of at least 16, and doubled until the entries fill less than 7/8 of it.
+        """
+        if new_capacity < self._size:
+            return
+        new_capacity = self._round_capacity(new_capacity)
+        while self._size >= new_capacity * 7 // 8:
+            new_capacity *= 2
+
+        # Move the full slots straight from the old arrays into new ones using their cached hashes.
+        old_control, old_hashes, old_keys, old_values = self._control, self._hashes, self._keys, self._values
+        old_capacity = self._capacity
+        self._capacity = new_capacity
+        self._allocate()
+        control, hashes, keys, values = self._control, self._hashes, self._keys, self._values
+        for old_index in range(old_capacity):
+            if not old_control[old_index] & _EMPTY:
+                hash = old_hashes[old_index]
+                index = self._free_index(hash)
+                # The fingerprint bits sit just below the group bits, so they move when the capacity does.
+                control[index] = self._fingerprint(hash)
+                hashes[index] = hash
+                keys[index] = old_keys[old_index]
+                values[index] = old_values[old_index]
+        self._tombstones = 0
+
+    def table_load(self) -> float:
+        """
+        Returns the load factor the map.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty slots within the map. Deleted slots are not empty, since probes may still walk
+        through them.
+        """
+        return self._capacity - self._size - self._tombstones
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the key or None if the key is not in the map.
+        """
+        index = self._find(key, self._hash(key))
+        if index < 0:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True or False based on whether or not the key is in the map.
+        """
+        return self._find(key, self._hash(key)) >= 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a key from the map. The slot goes back to EMPTY if its group still has an EMPTY slot, since then
+        no probe has ever gone past the group; otherwise it is marked DELETED.
+        """
+        index = self._find(key, self._hash(key))
+        if index < 0:
+            return
+        start = index & ~(_GROUP_WIDTH - 1)
+        if self._control.find(_EMPTY, start, start + _GROUP_WIDTH) >= 0:
+            self._control[index] = _EMPTY
+        else:
+            self._control[index] = _DELETED
+            self._tombstones += 1
+        self._keys[index] = None
+        self._values[index] = None
+        self._size -= 1
+        self._modifications += 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array where each element is a tuple of the key value pairs in the map.
+        """
+        our_array = DynamicArray()
+        for index in range(self._capacity):
+            if not self._control[index] & _EMPTY:
+                our_array.append((self._keys[index], self._values[index]))
+        return our_array
+
+    def clear(self) -> None:
+        """
+        Clears the hash map.
+        """
+        self._allocate()
+        self._size = 0
+        self._tombstones = 0
+
+    def keys(self) -> KeysView:
+        """Returns a live view of the keys of the map."""
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        """Returns a live view of the values of the map."""
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        """Returns a live view of the (key, value) pairs of the map."""
+        return ItemsView(self)
+
+    def _iterator(self, kind: int) -> HashMapIterator:
+        """Returns a new iterator over the map, see HashMapIterator."""
+        return HashMapIterator(self, kind)
+
+    def __iter__(self) -> HashMapIterator:
+        """
+        Iterator for loop. Yields each full slot as a HashEntry; each loop gets its own iterator.
+        """
+        return HashMapIterator(self, _ENTRIES)
+
+    def compact(self) -> None:
+        """Rehashes the entries at the same capacity, which drops every DELETED slot."""
+        self.resize_table(self._capacity)
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _round_capacity(capacity: int) -> int:
+        """Returns the smallest power of two that is at least capacity and at least one group."""
+        return max(_GROUP_WIDTH, 1 << (capacity - 1).bit_length())
+
+    def _hash(self, key: str) -> int:
+        """Returns the hash of key reduced to 64 bits and mixed, so its top bits are usable."""
+        return ((self._hash_function(key) & _MASK_64) * _GOLDEN_64) & _MASK_64
+
+    def _fingerprint(self, hash: int) -> int:
+        """Returns the 7 hash bits just below the ones that pick the group; they go in the control byte."""
+        return (hash >> self._fingerprint_shift) & 0x7F
+
+    def _find(self, key: str, hash: int) -> int:
+        """Returns the slot holding key, or -1 if key is not in the table."""
+        control, hashes, keys = self._control, self._hashes, self._keys
+        mask = self._group_mask
+        group = hash >> self._group_shift
+        fingerprint = (hash >> self._fingerprint_shift) & 0x7F
+        step = 0
+        while True:
+            start = group << _GROUP_BITS
+            end = start + _GROUP_WIDTH
+            index = control.find(fingerprint, start, end)
+            while index >= 0:
+                if hashes[index] == hash and keys[index] == key:
+                    return index
+                index = control.find(fingerprint, index + 1, end)
+            if control.find(_EMPTY, start, end) >= 0:
+                return -1
+            step += 1
+            group = (group + step) & mask
+
+    def _insert_index(self, key: str, hash: int) -> int:
+        """
+        Finds where to put key: the slot holding key if there is one, otherwise the first EMPTY or DELETED slot
+        on its probe sequence. The table must have an EMPTY slot.
+        """
+        control, hashes, keys = self._control, self._hashes, self._keys
+        mask = self._group_mask
+        group = hash >> self._group_shift
+        fingerprint = (hash >> self._fingerprint_shift) & 0x7F
+        step = 0
+        free = -1
+        while True:
+            start = group << _GROUP_BITS
+            end = start + _GROUP_WIDTH
+            index = control.find(fingerprint, start, end)
+            while index >= 0:
+                if hashes[index] == hash and keys[index] == key:
+                    return index
+                index = control.find(fingerprint, index + 1, end)
+            empty = control.find(_EMPTY, start, end)
+            if free < 0:
+                free = self._first_free(start, empty)
+            if empty >= 0:
+                return free
+            step += 1
+            group = (group + step) & mask
+
+    def _free_index(self, hash: int) -> int:
+        """Returns the first EMPTY or DELETED slot on the probe sequence of hash, for a key known to be missing."""
+        control = self._control
+        mask = self._group_mask
+        group = hash >> self._group_shift
+        step = 0
+        while True:
+            start = group << _GROUP_BITS
+            free = self._first_free(start, control.find(_EMPTY, start, start + _GROUP_WIDTH))
+            if free >= 0:
+                return free
+            step += 1
+            group = (group + step) & mask
+
+    def _first_free(self, start: int, empty: int) -> int:
+        """
+        Returns the first EMPTY or DELETED slot of the group at start, or -1 if it is full. empty is the first
+        EMPTY slot of the group, or -1.
+        """
+        if not self._tombstones:
+            return empty
+        deleted = self._control.find(_DELETED, start, start + _GROUP_WIDTH)
+        if deleted < 0 or 0 <= empty < deleted:
+            return empty
+        return deleted
+
+    def _allocate(self) -> None:
+        """Creates empty slot arrays for the current capacity."""
+        capacity = self._capacity
+        groups = capacity >> _GROUP_BITS
+        self._modifications += 1
+        self._group_mask = groups - 1
+        self._group_shift = 64 - (groups.bit_length() - 1)
+        self._fingerprint_shift = self._group_shift - 7
+        self._control = bytearray([_EMPTY]) * capacity
+        self._hashes = array('Q', [0]) * capacity
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+
+    def _entry(self, index: int) -> HashEntry:
+        """Returns the slot at index as a HashEntry, or None if it is empty."""
+        if self._control[index] == _EMPTY:
+            return None
+        entry = HashEntry(self._keys[index], self._values[index], self._hashes[index])
+        entry.is_tombstone = self._control[index] == _DELETED
+        return entry
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+
+if __name__ == "__main__":
+
+    print("\nput, get and remove")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    m.remove('str0')
+    print(m.get('str0'), m.get('str1'), m.contains_key('str0'), m.contains_key('str149'))
+
+    print("\nget_keys_and_values")
+    print("-------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    m.remove('1')
+    m.resize_table(12)
+    print(m.get_keys_and_values())
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
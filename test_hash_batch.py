@@ -0,0 +1,103 @@
+# Name: Mason Hunerkoch
+# Description: Parity tests: batch hashing must give the same hashes and bucket indices as the per-key functions.
+
+import random
+import unittest
+from unittest import mock
+
+import hash_batch
+from a6_include import hash_function_1, hash_function_2, hash_function_fnv1a
+
+FUNCTIONS = (hash_function_1, hash_function_2, hash_function_fnv1a)
+CAPACITIES = (1, 2, 11, 53, 1009, 100003, 2 ** 61 - 1)
+
+
+def make_batches() -> dict:
+    """Named batches of keys: ASCII, non-ASCII, empty, long, mixed, and sizes around the vectorizing cutoff."""
+    rnd = random.Random(0)
+    alphabet = 'abcxyz0123456789_-é€日本😀'
+    mixed = [''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(0, 40))) for _ in range(2000)]
+    return {
+        'ascii': ['str' + str(i) for i in range(1000)],
+        'non_ascii': [''.join(rnd.choice('éü€日本語😀𝄞') for _ in range(1 + i % 12)) for i in range(500)],
+        'empty_keys': [''] * 100,
+        'some_empty': ['', 'a', ''] * 40,
+        'long': ['k' * 1000 + str(i) for i in range(64)] + ['日' * 3000, '😀' * 2000],
+        'mixed': mixed,
+        'no_keys': [],
+        'one_key': ['only'],
+        'below_cutoff': mixed[:hash_batch._MIN_VECTOR_BATCH - 1],
+        'at_cutoff': mixed[:hash_batch._MIN_VECTOR_BATCH],
+    }
+
+
+class ParityMixin:
+    """The checks shared by both paths; the subclasses pick the path."""
+
+    def check_parity(self, keys: list) -> None:
+        for function in FUNCTIONS:
+            expected = [function(key) for key in keys]
+            self.assertEqual(hash_batch.hash_many(function, keys), expected, function.__name__)
+            self.assertEqual(hash_batch.hash_many(function, iter(keys)), expected, function.__name__)
+            for capacity in CAPACITIES:
+                self.assertEqual(hash_batch.bucket_indices(function, keys, capacity),
+                                 [value % capacity for value in expected], (function.__name__, capacity))
+
+    def test_batches(self) -> None:
+        for name, keys in make_batches().items():
+            with self.subTest(batch=name):
+                self.check_parity(keys)
+
+    def test_function_without_vector_version(self) -> None:
+        keys = make_batches()['mixed']
+        self.assertEqual(hash_batch.hash_many(len, keys), [len(key) for key in keys])
+        self.assertEqual(hash_batch.bucket_indices(len, keys, 7), [len(key) % 7 for key in keys])
+
+
+class FallbackParityTest(ParityMixin, unittest.TestCase):
+    """The pure-Python path, forced by hiding NumPy from hash_batch."""
+
+    def setUp(self) -> None:
+        patcher = mock.patch.object(hash_batch, 'np', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_never_vectorizes(self) -> None:
+        self.assertIsNone(hash_batch._vector_hashes(hash_function_1, make_batches()['ascii']))
+
+
+@unittest.skipUnless(hash_batch.NUMPY_AVAILABLE, "NumPy is not installed")
+class NumpyParityTest(ParityMixin, unittest.TestCase):
+    """The vectorized path."""
+
+    def test_vectorizes(self) -> None:
+        batches = make_batches()
+        for name in ('ascii', 'non_ascii', 'empty_keys', 'long', 'mixed', 'at_cutoff'):
+            for function in FUNCTIONS:
+                self.assertIsNotNone(hash_batch._vector_hashes(function, batches[name]), (name, function.__name__))
+        self.assertIsNone(hash_batch._vector_hashes(hash_function_1, batches['below_cutoff']))
+
+    def test_matrix_size_cutoff(self) -> None:
+        """A batch at the cell limit is vectorized, one cell over goes key by key, and both agree."""
+        keys = ['ab' * 8] * 64
+        cells = len(keys) * 16
+        for limit, vectorized in ((cells, True), (cells - 1, False)):
+            with mock.patch.object(hash_batch, '_MAX_VECTOR_CELLS', limit):
+                self.assertEqual(hash_batch._vector_hashes(hash_function_2, keys) is not None, vectorized)
+                self.check_parity(keys)
+
+    def test_oversized_batch(self) -> None:
+        """One very long key pushes a batch over the real cutoff without building the matrix."""
+        keys = make_batches()['ascii']
+        keys = keys + ['x' * (hash_batch._MAX_VECTOR_CELLS // len(keys) + 1)]
+        self.assertIsNone(hash_batch._vector_hashes(hash_function_1, keys))
+        self.assertEqual(hash_batch.hash_many(hash_function_1, keys), [hash_function_1(key) for key in keys])
+
+    def test_keys_that_do_not_encode(self) -> None:
+        """A batch with a key UTF-8 cannot encode falls back instead of raising."""
+        keys = ['str' + str(i) for i in range(100)] + ['\ud800']
+        self.assertIsNone(hash_batch._vector_hashes(hash_function_fnv1a, keys))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# Name: Mason Hunerkoch
+# Description: Tests that a failed ShardedHashMap batch leaves every shard ready for the next call.
+
+import unittest
+
+from hash_map_sharded import ShardedHashMap
+
+
+class FailedBatchTest(unittest.TestCase):
+    """After a batch fails, part way through or in a worker, the following calls must get their own replies."""
+
+    def setUp(self) -> None:
+        self.map = ShardedHashMap(4)
+        self.map.put_many(('key' + str(i), i) for i in range(200))
+
+    def tearDown(self) -> None:
+        self.map.close()
+
+    def check_map(self) -> None:
+        """The map still holds exactly key0..key199 and answers single and batched calls correctly."""
+        self.assertEqual(self.map.get_size(), 200)
+        self.assertEqual(self.map.get('key7'), 7)
+        self.assertIsNone(self.map.get('missing'))
+        keys = ['key' + str(i) for i in range(0, 200, 3)] + ['missing']
+        self.assertEqual(self.map.get_many(keys), list(range(0, 200, 3)) + [None])
+        self.assertTrue(self.map.contains_key('key199'))
+
+    def test_unpicklable_value(self) -> None:
+        """A send that fails on one shard must not leave the shards already sent to with unread replies."""
+        pairs = [('new' + str(i), i) for i in range(50)] + [('bad', lambda: None)]
+        with self.assertRaises(Exception):
+            self.map.put_many(pairs)
+        for key, _ in pairs:
+            self.map.remove(key)
+        self.check_map()
+
+    def test_worker_error(self) -> None:
+        """A batch that raises inside one worker must still read the replies of every other shard."""
+        with self.assertRaises(ValueError):
+            self.map.put_many([('key0', 0), ('bad', 1, 2), ('key1', 1)])
+        self.check_map()
+
+    def test_repeated_failures(self) -> None:
+        """Failures do not build up stale replies across calls."""
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.map.put_many([('bad', 1, 2)])
+            self.check_map()
+
+
+if __name__ == "__main__":
+    unittest.main()